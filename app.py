@@ -1,14 +1,19 @@
 import streamlit as st
-import pandas as pd
 import json
 import os
-import time
-import requests
-from utils.api_helper import APIHelper
+from utils.config_items import ConfigItem
+from utils.background_runner import BackgroundRun
+from utils.http_cache import get_shared_cache
+from utils.request_plan import compile_plan, execute_planned_request
+from utils.plan_optimizer import optimize_items
+from utils.cluster_state import get_cluster_state, get_token_cache
+from utils.history import TransactionHistory, TransactionRecorder, new_run_id, DEFAULT_HISTORY_DB
+from utils.clusters import cluster_host
 
 # --- 1. CONFIGURATION CONSTANTS ---
 CONFIG_PATH = os.path.join("config", "ui_configs.json")
 FIXED_CLIENT_ID = "configsapp"
+AUTH_TIMEOUT = (5, 10)  # (connect, read) seconds for the token call
 
 SCOPE_MAPPING = {
     "su": "Super User", "res": "Reseller", "om": "Office Manager",
@@ -65,6 +70,9 @@ STRING_CONFIGS = [
     "MOBILE_REGISTRATION_SERVER"
 ]
 
+# Stamped on every write from the web app (the rest of the payload comes from utils.request_plan)
+WRITE_DESCRIPTION = "Updated via Streamlit App"
+
 # --- 2. AUTHENTICATION ---
 def authenticate(api_url, client_secret, username, password):
     clean_url = api_url.replace("https://", "").replace("http://", "").strip("/")
@@ -76,20 +84,36 @@ def authenticate(api_url, client_secret, username, password):
         "username": username,
         "password": password
     }
+    # Sessions logging in with the same credentials reuse one live token instead of re-authenticating
+    token_cache = get_token_cache()
+    cache_key = token_cache.credential_key(cluster_host(api_url), FIXED_CLIENT_ID, client_secret, username, password)
+    cached = token_cache.get(cache_key)
+    if cached is not None:
+        return cached, clean_url
+
+    import requests  # Only needed at login; keeps reruns of the main screen light
     try:
-        response = requests.post(token_url, data=payload, timeout=10)
+        response = requests.post(token_url, data=payload, timeout=AUTH_TIMEOUT)
         response.raise_for_status()
-        return response.json(), clean_url
+        data = response.json()
+        token_cache.store(cache_key, data)
+        return data, clean_url
     except Exception as e:
         st.error(f"Authentication failed: {e}")
         return None, None
 
+@st.cache_data(max_entries=8)
+def read_blueprint(path, mtime):
+    """Parses the blueprint once per file version for all sessions; mtime is part of the cache key."""
+    with open(path, 'r') as f:
+        return json.load(f)
+
 # --- UPDATED LOADER LOGIC ---
 def load_blueprint_config(customer_name=None):
     """Loads JSON and performs the 'custID' replacement if a customer name is provided."""
     try:
-        with open(CONFIG_PATH, 'r') as f:
-            configs = json.load(f)
+        # cache_data hands every caller its own copy, so the replacement below never leaks between sessions
+        configs = read_blueprint(CONFIG_PATH, os.path.getmtime(CONFIG_PATH))
             
         if not isinstance(configs, list):
             st.error(f"Configuration file {CONFIG_PATH} must contain a JSON array.")
@@ -124,19 +148,21 @@ def run_execution_engine():
     # Initialize Session State
     if 'execution_queue' not in st.session_state:
         st.session_state['execution_queue'] = []
-    if 'current_step_index' not in st.session_state:
-        st.session_state['current_step_index'] = 0
     if 'execution_log' not in st.session_state:
         st.session_state['execution_log'] = []
     if 'app_phase' not in st.session_state:
         st.session_state['app_phase'] = "SETUP"
 
-    # --- TOP COMPONENT: LIVE LOG ---
-    with st.expander("📡 Live API Transaction Log", expanded=True):
-        if st.session_state['execution_log']:
-            st.dataframe(pd.DataFrame(st.session_state['execution_log']), use_container_width=True, hide_index=True)
-        else:
-            st.info("Waiting to start...")
+    # --- TOP COMPONENT: LIVE LOG (redrawn by the progress fragment while a run is active) ---
+    if st.session_state['app_phase'] != "RUNNING":
+        with st.expander("📡 Live API Transaction Log", expanded=True):
+            render_execution_log()
+
+    # --- BACKGROUND JOBS (submitted with jobs.py) ---
+    render_job_queue()
+
+    # --- TRANSACTION HISTORY (EVERY RUN, BOTH FRONTENDS) ---
+    render_transaction_history()
 
     # --- PHASE 1: SETUP (THE GATEKEEPERS) ---
     if st.session_state['app_phase'] == "SETUP":
@@ -164,6 +190,17 @@ def run_execution_engine():
                 "Do you want to set/change CSS color configurations?",
                 ("No", "Yes"), index=0
             )
+
+            deadline_minutes = st.number_input(
+                "Run deadline (minutes, 0 = no limit)", min_value=0, value=0,
+                help="Overall time budget for the push; requests are cut short and the run stops once it is spent."
+            )
+
+            optimize_writes = st.checkbox(
+                "Optimize writes",
+                help="Send entries that list every scope once as scope '*', and skip writes that a later entry overwrites. "
+                     "Leave off if the cluster has scope-specific rows for those configs."
+            )
             
             submitted = st.form_submit_button("Start Execution")
             
@@ -179,167 +216,303 @@ def run_execution_engine():
                     filtered_queue = []
                     
                     for config in raw_configs:
+                        item = ConfigItem.from_dict(config, resolve_scope=lambda s: SCOPE_MAPPING.get(s, s))
+
                         # Filter 1: Resellers
-                        if "reseller" in config and include_resellers == "No":
+                        if item.is_reseller and include_resellers == "No":
                             continue
                         
                         # Filter 2: CSS Colors
-                        if config["config_name"] in UI_CONFIG_PROMPT_COLOR_HEX and include_css == "No":
+                        if item.config_name in UI_CONFIG_PROMPT_COLOR_HEX and include_css == "No":
                             continue
                             
-                        filtered_queue.append(config)
+                        filtered_queue.append(item)
                     
                     if not filtered_queue:
                         st.error("No configurations selected based on your choices.")
                     else:
                         st.session_state['execution_queue'] = filtered_queue
-                        st.session_state['app_phase'] = "RUNNING"
-                        st.session_state['current_step_index'] = 0
+                        st.session_state['run_deadline_minutes'] = deadline_minutes
+                        st.session_state['optimize_writes'] = optimize_writes
+                        st.session_state['customer_name'] = cust_name_input
+                        if any(needs_input(item) for item in filtered_queue):
+                            st.session_state['app_phase'] = "INPUTS"
+                        else:
+                            start_background_run(filtered_queue)
                         st.rerun()
 
-    # --- PHASE 2: RUNNING (THE LOOP) ---
+    # --- PHASE 2: INPUTS (ALL PROMPTS ON ONE FORM, BEFORE ANY WRITE) ---
+    elif st.session_state['app_phase'] == "INPUTS":
+        render_inputs_form(st.session_state['execution_queue'])
+
+    # --- PHASE 3: RUNNING (BACKGROUND THREAD, UI ONLY POLLS) ---
     elif st.session_state['app_phase'] == "RUNNING":
-        process_queue()
+        render_run_progress()
 
-    # --- PHASE 3: FINISHED ---
+    # --- PHASE 4: FINISHED ---
     elif st.session_state['app_phase'] == "FINISHED":
-        st.success("✅ All configurations completed!")
+        run = st.session_state.get('background_run')
+        if run is not None and run.error:
+            st.error(f"Run stopped after {run.done}/{run.total} writes: {run.error}")
+        elif run is not None and run.cancelled:
+            st.warning(f"Run cancelled after {run.done}/{run.total} writes.")
+        else:
+            st.success("✅ All configurations completed!")
+        render_optimization_report()
+        render_verification()
         if st.button("Start Over"):
             st.session_state['app_phase'] = "SETUP"
             st.session_state['execution_log'] = []
+            st.session_state['background_run'] = None
+            st.session_state['execution_plan'] = None
             st.rerun()
 
-def process_queue():
-    queue = st.session_state['execution_queue']
-    index = st.session_state['current_step_index']
+def render_execution_log():
+    if st.session_state['execution_log']:
+        import pandas as pd  # Deferred: only needed once there is something to render
+        st.dataframe(pd.DataFrame(st.session_state['execution_log']), use_container_width=True, hide_index=True)
+    else:
+        st.info("Waiting to start...")
+
+def render_optimization_report():
+    report = st.session_state.get('optimization_report')
+    if report is not None and report.saved:
+        st.caption(f"Optimizer saved {report.saved} of {report.writes_before} writes "
+                   f"({report.collapsed} collapsed scope fan-outs, {report.merged} duplicate targets).")
 
-    if index >= len(queue):
-        st.session_state['app_phase'] = "FINISHED"
-        st.rerun()
+def render_verification():
+    """Re-reads the cluster once and compares it with everything the finished plan wrote."""
+    plan = st.session_state.get('execution_plan')
+    if not plan or not st.button("🔎 Verify applied configs"):
+        return
+    from utils.verification import verify_plan
+    from utils.api_helper import APIHelper
+    from utils.circuit_breaker import CircuitOpenError
+    import pandas as pd
+    api = APIHelper(st.session_state['api_url'], st.session_state['access_token'])
+    try:
+        with st.spinner("Reading back configurations..."):
+            report = verify_plan(api, plan)
+    except (ValueError, CircuitOpenError) as e:
+        st.error(f"Verification failed: {e}")
         return
+    if report.ok:
+        st.success(f"✅ {report.matched}/{report.checked} written configs match the cluster.")
+        return
+    st.warning(f"⚠️ {report.matched}/{report.checked} written configs match; {len(report.drift)} drifted.")
+    st.dataframe(pd.DataFrame([
+        {"Config": d.config_name, "Scope": d.scope, "Reseller": d.reseller, "Expected": d.expected, "Actual": d.actual}
+        for d in report.drift
+    ]), use_container_width=True, hide_index=True)
 
-    current_item = queue[index]
-    config_name = current_item["config_name"]
-    
-    is_reseller = "reseller" in current_item
-    
-    needs_input = False
-    if not is_reseller:
-        if config_name in UI_CONFIG_PROMPT_COLOR_HEX: needs_input = True
-        elif config_name in YES_NO_CONFIGS: needs_input = True
-        elif config_name in NUMERIC_CONFIGS: needs_input = True
-        elif config_name in STRING_CONFIGS: needs_input = True
-
-    st.markdown(f"### Step {index + 1}/{len(queue)}: `{config_name}`")
-    
-    if needs_input:
-        render_input_form(current_item)
-    else:
-        with st.spinner(f"Applying {config_name}..."):
-            execute_api_call(current_item, current_item.get("config_value"))
-        st.session_state['current_step_index'] += 1
-        time.sleep(0.2) 
-        st.rerun()
-
-def render_input_form(item):
-    name = item["config_name"]
-    default_val = item.get("config_value", "")
+def render_job_queue():
+    from utils.job_queue import DEFAULT_JOB_DB
+    if not os.path.exists(DEFAULT_JOB_DB):
+        return  # No job service in use on this host
+    # This runs on every rerun: only open the queue (and import pandas) while the panel is switched on
+    if not st.toggle("🗂️ Job Queue", key="job_queue_open"):
+        return
+
+    from utils.job_queue import JobQueue
+    import pandas as pd
+    job_queue = JobQueue(DEFAULT_JOB_DB)
+
+    with st.container(border=True):
+        status_filter = st.selectbox("Status", ["all", "queued", "running", "succeeded", "failed"], key="job_status_filter")
+        jobs = job_queue.list_jobs(status=None if status_filter == "all" else status_filter)
+        if not jobs:
+            st.info("No jobs.")
+            return
+
+        jobs_df = pd.DataFrame(jobs)
+        for column in ("created_at", "started_at", "finished_at"):
+            jobs_df[column] = pd.to_datetime(jobs_df[column], unit="s")
+        st.dataframe(jobs_df, use_container_width=True, hide_index=True)
+
+        job_id = st.selectbox("Show log for job", [job["id"] for job in jobs], key="job_log_select")
+        st.code("\n".join(job_queue.get_logs(job_id)) or "(no log lines yet)")
+        if st.button("Refresh jobs"):
+            st.rerun()
+
+def render_transaction_history():
+    if not os.path.exists(DEFAULT_HISTORY_DB):
+        return  # Nothing has been recorded on this host yet
+    # This runs on every rerun: only open the database while the view is switched on
+    if not st.toggle("📚 Transaction History", key="history_open"):
+        return
+
+    import pandas as pd
+    history = TransactionHistory(DEFAULT_HISTORY_DB)
+
+    with st.container(border=True):
+        col1, col2, col3 = st.columns(3)
+        cluster = col1.text_input("Cluster (host or URL)", key="history_cluster").strip()
+        customer = col2.text_input("Customer", key="history_customer").strip()
+        config_name = col3.text_input("Config name", key="history_config").strip()
+        col4, col5 = st.columns(2)
+        failed_only = col4.checkbox("Failed writes only", key="history_failed")
+        limit = col5.number_input("Max rows", min_value=10, max_value=10000, value=500, step=100, key="history_limit")
+
+        rows = history.query(cluster=cluster or None, customer=customer or None, config_name=config_name or None,
+                             failed_only=failed_only, limit=int(limit))
+        if not rows:
+            st.info("No matching writes.")
+        else:
+            rows_df = pd.DataFrame(rows)
+            rows_df["ts"] = pd.to_datetime(rows_df["ts"], unit="s")
+            st.dataframe(rows_df, use_container_width=True, hide_index=True)
+
+        st.caption("Recent runs")
+        runs = history.list_runs()
+        if runs:
+            runs_df = pd.DataFrame(runs)
+            for column in ("started_at", "finished_at"):
+                runs_df[column] = pd.to_datetime(runs_df[column], unit="s")
+            st.dataframe(runs_df, use_container_width=True, hide_index=True)
+
+def needs_input(item):
+    if item.is_reseller:
+        return False
+    name = item.config_name
+    return (name in UI_CONFIG_PROMPT_COLOR_HEX or name in YES_NO_CONFIGS
+            or name in NUMERIC_CONFIGS or name in STRING_CONFIGS)
+
+def render_inputs_form(queue):
+    st.header("2. Configuration Values")
+    with st.form("inputs_form"):
+        values = {}
+        for index, item in enumerate(queue):
+            if needs_input(item):
+                values[index] = render_input_widget(item, key=f"input_{index}")
+
+        if st.form_submit_button("Submit & Apply"):
+            final_queue = [item.with_value(values[index]) if index in values else item for index, item in enumerate(queue)]
+            st.session_state['execution_queue'] = final_queue
+            start_background_run(final_queue)
+            st.rerun()
+
+def render_input_widget(item, key):
+    name = item.config_name
+    default_val = item.config_value
     
     # 1. Look up help text (returns None if not found, which is fine)
     help_tooltip = CONFIG_HELP_TEXT.get(name, None)
+    user_val = default_val 
     
-    with st.form(key=f"step_{st.session_state['current_step_index']}"):
-        user_val = default_val 
+    # Color Picker (No help text usually needed, but can be added if defined)
+    if name in UI_CONFIG_PROMPT_COLOR_HEX:
+        st.info(f"🎨 **Color Config**: {UI_CONFIG_PROMPT_COLOR_HEX[name]}")
+        safe_color = default_val if str(default_val).startswith("#") else "#000000"
+        user_val = st.color_picker(f"Select color for {name}", safe_color, help=help_tooltip, key=key)
         
-        # Color Picker (No help text usually needed, but can be added if defined)
-        if name in UI_CONFIG_PROMPT_COLOR_HEX:
-            st.info(f"🎨 **Color Config**: {UI_CONFIG_PROMPT_COLOR_HEX[name]}")
-            safe_color = default_val if str(default_val).startswith("#") else "#000000"
-            user_val = st.color_picker(f"Select color for {name}", safe_color, help=help_tooltip)
-            
-        # Radio Buttons
-        elif name in YES_NO_CONFIGS:
-            idx = 0 if str(default_val).lower() == "yes" else 1
-            user_val = st.radio(f"Set {name}", ["yes", "no"], index=idx, help=help_tooltip)
-            
-        # Numeric Inputs
-        elif name in NUMERIC_CONFIGS:
-            user_val = st.number_input(
-                f"Set value for {name}", 
-                value=int(default_val) if str(default_val).isdigit() else 0,
-                help=help_tooltip
-            )
-            
-        # Text Inputs
-        elif name in STRING_CONFIGS:
-            user_val = st.text_input(f"Enter value for {name}", value=default_val, help=help_tooltip)
+    # Radio Buttons
+    elif name in YES_NO_CONFIGS:
+        idx = 0 if str(default_val).lower() == "yes" else 1
+        user_val = st.radio(f"Set {name}", ["yes", "no"], index=idx, help=help_tooltip, key=key)
+        
+    # Numeric Inputs
+    elif name in NUMERIC_CONFIGS:
+        user_val = st.number_input(
+            f"Set value for {name}", 
+            value=int(default_val) if str(default_val).isdigit() else 0,
+            help=help_tooltip,
+            key=key
+        )
+        
+    # Text Inputs
+    elif name in STRING_CONFIGS:
+        user_val = st.text_input(f"Enter value for {name}", value=default_val, help=help_tooltip, key=key)
 
-        if st.form_submit_button("Submit & Apply"):
-            execute_api_call(item, user_val)
-            st.session_state['current_step_index'] += 1
-            st.rerun()
+    return user_val
 
-def execute_api_call(item, final_value):
-    api = APIHelper(st.session_state['api_url'], st.session_state['access_token'])
-    
-    scopes = item.get("scopes", item.get("scope", []))
-    if isinstance(scopes, str):
-        scopes = [s.strip() for s in scopes.split(",")]
-    
-    validated_scopes = [SCOPE_MAPPING.get(s, s) for s in scopes]
-    
-    payload = {
-        "config-name": item["config_name"],
-        "config-value": str(final_value),
-        "admin-ui-account-type": "*",
-        "reseller": item.get("reseller", "*"),
-        "user": "*",
-        "domain": "*",
-        "description": "Updated via Streamlit App"
-    }
+def start_background_run(queue):
+    """Starts applying queue on a worker thread tied to this session and switches to the RUNNING phase."""
+    # Build the API client here: the worker thread must not read st.session_state.
+    # Imported here, like requests at login: every module that pulls in requests stays off the rerun path
+    from utils.api_helper import APIHelper
+    from utils.timeouts import RunDeadline
+    deadline_minutes = st.session_state.get('run_deadline_minutes', 0)
+    deadline = RunDeadline(deadline_minutes * 60) if deadline_minutes else None
+    api = APIHelper(st.session_state['api_url'], st.session_state['access_token'],
+                    cache=get_shared_cache(st.session_state['api_url'], st.session_state['access_token']), deadline=deadline)
+    st.session_state['optimization_report'] = None
+    if st.session_state.get('optimize_writes'):
+        queue, st.session_state['optimization_report'] = optimize_items(queue, SCOPE_MAPPING.values())
+    # Payloads are built and serialized once here; the worker only sends bytes
+    plan = compile_plan(queue, description=WRITE_DESCRIPTION)
+    st.session_state['execution_plan'] = plan
+    recorder = TransactionRecorder(TransactionHistory(), new_run_id(), st.session_state['api_url'],
+                                   st.session_state.get('customer_name'))
+    state = get_cluster_state(st.session_state['api_url'], st.session_state['access_token'])
+    run = BackgroundRun(plan, lambda request: execute_api_call(api, request, recorder, state), on_done=recorder.close,
+                        on_start=lambda: state.ensure_configurations(api, logger=api.logger))
+    st.session_state['background_run'] = run.start()
+    st.session_state['app_phase'] = "RUNNING"
 
-    targets = validated_scopes if validated_scopes else ["*"]
-    
-    for scope in targets:
-        payload["user-scope"] = scope
-        try:
-            # Attempt POST
-            resp = api.post("ns-api/v2/configurations", payload)
-            
-            # --- STATUS CODE LOGIC ---
-            if resp.ok:
-                if resp.status_code == 202:
-                    status = "✅ Updated : 202"
-                elif resp.status_code == 201:
-                    status = "✅ Created : 201"
-                else:
-                    status = f"✅ Success : {resp.status_code}"
-            else:
-                status = f"❌ {resp.status_code}"
+@st.fragment(run_every=0.5)
+def render_run_progress():
+    """Polls the background run; only this fragment reruns while the worker is busy."""
+    run = st.session_state.get('background_run')
+    if run is None:
+        st.session_state['app_phase'] = "SETUP"
+        st.rerun(scope="app")
+
+    # Newest entries first, matching the original live log
+    for entry in run.poll():
+        st.session_state['execution_log'].insert(0, entry)
+
+    st.progress(run.done / run.total if run.total else 1.0, text=f"Sent {run.done}/{run.total} configuration writes")
+    render_optimization_report()
+    if st.button("Cancel run"):
+        run.cancel()
+
+    with st.expander("📡 Live API Transaction Log", expanded=True):
+        render_execution_log()
+
+    if run.finished:
+        st.session_state['app_phase'] = "FINISHED"
+        st.rerun(scope="app")
+
+def execute_api_call(api, request, recorder=None, state=None):
+    """Sends one planned write (POST, plus PUT on 409), records its outcome and returns its log entries."""
+    from utils.circuit_breaker import CircuitOpenError
+    from utils.timeouts import DeadlineExceeded
+    try:
+        result = execute_planned_request(api, request, state=state)
+        if recorder is not None:
+            recorder.record(request, result)
+        resp = result.response
+
+        # --- STATUS CODE LOGIC ---
+        if not resp.ok:
+            status = f"❌ {resp.status_code}"
+        elif result.verb == "PUT":
+            # POST hit 409 Conflict and the PUT updated the existing config
+            status = f"✅ Updated : {resp.status_code}"
+        elif resp.status_code == 202:
+            status = "✅ Updated : 202"
+        elif resp.status_code == 201:
+            status = "✅ Created : 201"
+        else:
+            status = f"✅ Success : {resp.status_code}"
             
-            # Handle 409 Conflict -> Try PUT
-            if resp.status_code == 409:
-                resp = api.put("ns-api/v2/configurations", payload)
-                
-                # Update status for the PUT attempt
-                if resp.ok:
-                    if resp.status_code == 202:
-                        status = "✅ Updated : 202"
-                    else:
-                        status = f"✅ Updated : {resp.status_code}"
-                else:
-                    status = f"❌ {resp.status_code}"
-                
-        except Exception as e:
-            status = f"❌ Error: {str(e)}"
-
-        log_entry = {
-            "Status": status,
-            "Config": item["config_name"],
-            "Value": str(final_value),
-            "Scope": scope
-        }
-        st.session_state['execution_log'].insert(0, log_entry)
+    except (CircuitOpenError, DeadlineExceeded) as e:
+        # The cluster stopped answering or the run is out of time: end the run instead of failing every remaining write
+        if recorder is not None:
+            recorder.record(request, error=e)
+        raise
+    except Exception as e:
+        if recorder is not None:
+            recorder.record(request, error=e)
+        status = f"❌ Error: {str(e)}"
+
+    log_entry = {
+        "Status": status,
+        "Config": request.task.config_name,
+        "Value": request.task.config_value,
+        "Scope": request.task.scope
+    }
+    return [log_entry]
         
 # --- LOGIN SCREEN ---
 if 'authenticated' not in st.session_state:
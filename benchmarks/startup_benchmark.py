@@ -0,0 +1,70 @@
+"""
+Measures cold-start cost of the CLI and the modules the Streamlit worker imports.
+
+Each target runs in a fresh interpreter so nothing is cached between samples.
+
+Usage:
+    python benchmarks/startup_benchmark.py [--runs 10]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The utils modules app.py imports at the top, which every Streamlit rerun pays for (streamlit itself
+# is left out so this runs without it); errors if any of them pulls in requests
+APP_IMPORTS = (
+    "import ast, importlib, sys; "
+    "tree = ast.parse(open('app.py').read()); "
+    "[importlib.import_module(node.module) for node in tree.body if isinstance(node, ast.ImportFrom) and node.module.startswith('utils.')]; "
+    "sys.exit('requests imported by app.py top-level imports' if 'requests' in sys.modules else 0)"
+)
+
+TARGETS = [
+    ("python (baseline)", ["-c", "pass"]),
+    ("import utils.logging_setup", ["-c", "import utils.logging_setup"]),
+    ("import utils.validators", ["-c", "import utils.validators"]),
+    ("import utils.api_helper", ["-c", "import utils.api_helper"]),
+    ("import ui_configs", ["-c", "import ui_configs"]),
+    ("app.py utils imports", ["-c", APP_IMPORTS]),
+    ("ui_configs.py --help", ["ui_configs.py", "--help"]),
+]
+
+def time_target(argv, runs, env):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable] + argv, cwd=REPO_ROOT, env=env,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        samples.append((time.perf_counter() - start) * 1000)
+        if result.returncode != 0:
+            return None, result.stderr.decode(errors="replace").strip().splitlines()[-1]
+    return samples, None
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start benchmark for ns-blueprint-ui-configs")
+    parser.add_argument("--runs", type=int, default=10, help="Fresh interpreters per target (default: 10)")
+    args = parser.parse_args()
+
+    # Point LOG_DIR at a scratch directory so a stray import-time side effect would show up there
+    log_dir = tempfile.mkdtemp(prefix="startup_bench_logs_")
+    env = dict(os.environ, LOG_DIR=log_dir)
+
+    print(f"{'target':<30} {'median ms':>10} {'min ms':>10} {'max ms':>10}")
+    for label, argv in TARGETS:
+        samples, error = time_target(argv, args.runs, env)
+        if samples is None:
+            print(f"{label:<30} {'error':>10}   {error}")
+            continue
+        print(f"{label:<30} {statistics.median(samples):>10.1f} {min(samples):>10.1f} {max(samples):>10.1f}")
+
+    created = os.listdir(log_dir)
+    print(f"\nFiles created in LOG_DIR by imports: {len(created)}" + (f" ({', '.join(created)})" if created else ""))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Job service for unattended blueprint pushes.
+
+    python jobs.py submit --cluster https://api.example.ucaas.tech --customer sgdemo --answers answers.json
+    python jobs.py work --workers 4
+    python jobs.py list [--status failed]
+    python jobs.py logs 12
+
+Jobs live in a local SQLite queue (JOB_DB_PATH, default data/jobs.db). Each worker process claims
+one job at a time and runs it through ui_configs.update_configurations() in headless mode, using
+API_TOKEN_<HOST> (or API_TOKEN) from the environment / .env for the job's cluster.
+"""
+import argparse
+import multiprocessing
+import os
+import socket
+import sys
+import time
+
+from utils.job_queue import JobQueue, JobLogHandler, DEFAULT_JOB_DB
+from utils.logging_setup import setup_logging, DEFAULT_LOG_FORMAT
+from utils.validators import validate_url
+
+DEFAULT_BLUEPRINT = os.path.join("config", "ui_configs.json")
+
+def run_job(job_queue, job, logger):
+    """Executes one claimed job, streaming its log lines into the queue."""
+    import ui_configs
+    import logging
+
+    handler = JobLogHandler(job_queue, job["id"])
+    handler.setFormatter(logging.Formatter(DEFAULT_LOG_FORMAT))
+    logger.addHandler(handler)
+    error = None
+    try:
+        logger.info(f"Job {job['id']} started on {job['worker']}: cluster={job['cluster']} customer={job['customer']}")
+        ui_configs.update_configurations(
+            customer_name=job["customer"],
+            config_file=job["blueprint"],
+            api_url=job["cluster"],
+            answers=job["answers"],
+            options=ui_configs.RunOptions(run_id=f"job-{job['id']}")
+        )
+        logger.info(f"Job {job['id']} succeeded")
+    except Exception as e:
+        error = str(e)
+        logger.error(f"Job {job['id']} failed: {error}")
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+        job_queue.finish(job["id"], error=error)
+
+def worker_loop(db_path, worker_id, poll_interval, once):
+    logger = setup_logging()
+    job_queue = JobQueue(db_path)
+    logger.info(f"Worker {worker_id} polling {db_path}")
+    while True:
+        job = job_queue.claim(worker_id)
+        if job is None:
+            if once:
+                return
+            time.sleep(poll_interval)
+            continue
+        run_job(job_queue, job, logger)
+
+def cmd_submit(args):
+    import ui_configs
+    cluster = validate_url(args.cluster)
+    answers = ui_configs.load_answers(args.answers)
+    # Fail at submit time rather than in a worker if a gatekeeper or prompted value is missing or invalid
+    for customer in args.customer or [None]:
+        ui_configs.render_headless(ui_configs.load_items(args.blueprint, customer), answers)
+    if args.verify_domains:
+        if not args.customer:
+            raise ValueError("--verify-domains needs at least one --customer.")
+        ui_configs.preflight_domains(cluster, args.customer, page_size=args.domain_page_size)
+    job_queue = JobQueue(args.db)
+    for customer in args.customer or [None]:
+        job_id = job_queue.submit(cluster, customer, args.blueprint, answers)
+        print(f"Queued job {job_id}: cluster={cluster} customer={customer}")
+
+def cmd_work(args):
+    host = socket.gethostname()
+    if args.requeue:
+        count = JobQueue(args.db).requeue_running(worker_prefix=f"{host}:")
+        print(f"Requeued {count} interrupted job(s) from {host}")
+    if args.workers == 1:
+        worker_loop(args.db, f"{host}:{os.getpid()}", args.poll, args.once)
+        return
+    processes = []
+    for index in range(args.workers):
+        process = multiprocessing.Process(
+            target=worker_loop,
+            args=(args.db, f"{host}:{os.getpid()}:{index}", args.poll, args.once),
+            daemon=True
+        )
+        process.start()
+        processes.append(process)
+    for process in processes:
+        process.join()
+
+def cmd_list(args):
+    jobs = JobQueue(args.db).list_jobs(status=args.status, limit=args.limit)
+    print(f"{'id':>6}  {'status':<10} {'cluster':<40} {'customer':<20} error")
+    for job in jobs:
+        print(f"{job['id']:>6}  {job['status']:<10} {job['cluster']:<40} {str(job['customer']):<20} {job['error'] or ''}")
+
+def cmd_logs(args):
+    for line in JobQueue(args.db).get_logs(args.job_id):
+        print(line)
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Persistent job queue for blueprint pushes.")
+    parser.add_argument("--db", default=DEFAULT_JOB_DB, help=f"SQLite queue file (default: {DEFAULT_JOB_DB})")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    submit = sub.add_parser("submit", help="Queue a push (one job per --customer)")
+    submit.add_argument("--cluster", required=True, help="Full API URL (e.g., https://api.example.ucaas.tech)")
+    submit.add_argument("--customer", action="append", help="Customer name for 'custID' replacement (repeatable)")
+    submit.add_argument("--blueprint", default=DEFAULT_BLUEPRINT, help=f"Blueprint JSON (default: {DEFAULT_BLUEPRINT})")
+    submit.add_argument("--answers", required=True, help="Headless answers file (see ui_configs.py --answers)")
+    submit.add_argument("--verify-domains", action="store_true", help="Check every customer domain exists before queueing anything")
+    submit.add_argument("--domain-page-size", type=int, help="Read the domain list in concurrent pages of this size")
+    submit.set_defaults(func=cmd_submit)
+
+    work = sub.add_parser("work", help="Run worker processes that claim and execute queued jobs")
+    work.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (default: CPU count)")
+    work.add_argument("--poll", type=float, default=2.0, help="Seconds between polls of an empty queue")
+    work.add_argument("--once", action="store_true", help="Exit once the queue is empty")
+    work.add_argument("--requeue", action="store_true", help="Requeue jobs left 'running' by a previous worker on this host")
+    work.set_defaults(func=cmd_work)
+
+    list_cmd = sub.add_parser("list", help="Show recent jobs")
+    list_cmd.add_argument("--status", choices=["queued", "running", "succeeded", "failed"])
+    list_cmd.add_argument("--limit", type=int, default=50)
+    list_cmd.set_defaults(func=cmd_list)
+
+    logs = sub.add_parser("logs", help="Print the log of one job")
+    logs.add_argument("job_id", type=int)
+    logs.set_defaults(func=cmd_logs)
+    return parser
+
+if __name__ == "__main__":
+    args = build_arg_parser().parse_args()
+    try:
+        args.func(args)
+    except (ValueError, KeyboardInterrupt) as e:
+        print(f"Error: {e}" if str(e) else "Interrupted")
+        sys.exit(1)
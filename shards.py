@@ -0,0 +1,97 @@
+"""
+Sharded rollouts across machines.
+
+    # on node k of 4 (same answers file and run id everywhere)
+    python ui_configs.py --answers answers.json --clusters https://api.a.ucaas.tech,https://api.b.ucaas.tech \\
+        --customers sgdemo,acme,globex --shard k/4 --run-id rollout-0612
+
+    python shards.py plan --clusters https://api.a.ucaas.tech,https://api.b.ucaas.tech --customers sgdemo,acme,globex --count 4
+    python shards.py merge data/shard-*-of-4.jsonl [--report rollout.json]
+
+With several customers, every shard that runs customers of a cluster first sends that cluster's
+customer-invariant writes itself (they are idempotent), so shards never wait for each other.
+
+merge checks that every shard 1..N is present, finished and from the same run, prints one report,
+and imports all shard writes into the transaction history (HISTORY_DB_PATH, default data/history.db).
+Nothing is imported while shards are missing or unfinished. The import replaces any rows already
+recorded for the run id, so merging the same rollout again is harmless.
+"""
+import argparse
+import json
+import sys
+
+from utils.history import TransactionHistory, DEFAULT_HISTORY_DB
+from utils.sharding import SHARED_UNIT, merge_shards, shard_units, work_units
+
+def split_list(raw):
+    return [part.strip() for part in raw.split(",") if part.strip()]
+
+def cmd_plan(args):
+    customers = split_list(args.customers)
+    dedup = not args.no_dedup and len(customers) > 1
+    units = work_units(split_list(args.clusters), customers, shared=dedup)
+    for index in range(1, args.count + 1):
+        mine = shard_units(units, index, args.count)
+        print(f"Shard {index}/{args.count}: {len(mine)} unit(s)")
+        for cluster, customer in mine:
+            print(f"   {cluster} / {'shared writes' if customer == SHARED_UNIT else customer}")
+
+def cmd_merge(args):
+    merged = merge_shards(args.files)
+    count = merged["count"]
+    print(f"Merged {len(merged['shards'])}/{count} shard(s) of run {merged['run_id']}: {len(merged['writes'])} writes, {len(merged['failed'])} failed")
+    for shard in merged["shards"]:
+        state = "finished" if shard["finished"] else "INCOMPLETE"
+        print(f"   {shard['index']}/{count} on {shard['host']}: {shard['units']} unit(s), {shard['writes']} writes, {state} ({shard['path']})")
+    if merged["missing"]:
+        print(f"   MISSING shard(s): {', '.join(str(index) for index in merged['missing'])}")
+    for cluster, totals in sorted(merged["clusters"].items()):
+        print(f"   {cluster}: {totals['writes']} writes, {totals['failed']} failed")
+    for unit in merged["units"]:
+        if unit["error"]:
+            print(f"   UNIT FAILED: {unit['cluster']} / {unit['customer']}: {unit['error']}")
+    for row in merged["failed"]:
+        print(f"   FAILED: {row['cluster']} {row['customer'] or SHARED_UNIT} {row['config_name']} (Scope: {row['scope']}, Reseller: {row['reseller']}): "
+              f"{row['status'] if row['status'] is not None else row['error']}")
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump({key: merged[key] for key in ("run_id", "count", "shards", "missing", "unfinished", "units", "failed", "clusters")}, f, indent=2)
+        print(f"Report written to {args.report}")
+
+    incomplete = merged["missing"] or merged["unfinished"]
+    if incomplete and not args.no_history:
+        print(f"Not importing into {args.db}: merge again once every shard has finished")
+    elif not args.no_history:
+        TransactionHistory(args.db).replace_run(merged["run_id"], merged["writes"])
+        print(f"Imported {len(merged['writes'])} writes into {args.db} as run {merged['run_id']}")
+
+    if incomplete or merged["failed"] or any(unit["error"] for unit in merged["units"]):
+        sys.exit(2)
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Plan and merge sharded blueprint rollouts.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    plan = sub.add_parser("plan", help="Show which shard runs each (cluster, customer) unit")
+    plan.add_argument("--clusters", required=True, help="Comma-separated API URLs, as passed to ui_configs.py")
+    plan.add_argument("--customers", required=True, help="Comma-separated customer names")
+    plan.add_argument("--count", type=int, required=True, help="Number of shards (N)")
+    plan.add_argument("--no-dedup", action="store_true", help="Match ui_configs.py --no-dedup (no shared-writes unit)")
+    plan.set_defaults(func=cmd_plan)
+
+    merge = sub.add_parser("merge", help="Combine shard journals into one report and the transaction history")
+    merge.add_argument("files", nargs="+", help="Shard journal files (data/shard-<i>-of-<N>.jsonl)")
+    merge.add_argument("--report", help="Also write the merged report as JSON")
+    merge.add_argument("--db", default=DEFAULT_HISTORY_DB, help=f"Transaction history to import into (default: {DEFAULT_HISTORY_DB})")
+    merge.add_argument("--no-history", action="store_true", help="Only report; do not import the writes")
+    merge.set_defaults(func=cmd_merge)
+    return parser
+
+if __name__ == "__main__":
+    args = build_arg_parser().parse_args()
+    try:
+        args.func(args)
+    except (ValueError, OSError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
@@ -0,0 +1,28 @@
+import sys
+import types
+
+try:
+    import requests  # noqa: F401
+except ImportError:
+    # The HTTP-facing modules only need requests' exception types at import time; tests never reach the network
+    class RequestException(IOError):
+        pass
+
+    class ConnectionError(RequestException):
+        pass
+
+    class Timeout(RequestException):
+        pass
+
+    class ReadTimeout(Timeout):
+        pass
+
+    def request(*args, **kwargs):
+        raise ConnectionError("requests is not installed; patch requests.request in the test")
+
+    requests = types.ModuleType("requests")
+    requests.exceptions = types.SimpleNamespace(RequestException=RequestException, ConnectionError=ConnectionError,
+                                                Timeout=Timeout, ReadTimeout=ReadTimeout)
+    requests.RequestException, requests.ConnectionError, requests.Timeout = RequestException, ConnectionError, Timeout
+    requests.request = request
+    sys.modules["requests"] = requests
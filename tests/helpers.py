@@ -0,0 +1,6 @@
+from utils.config_items import WriteTask
+from utils.request_plan import compile_task
+
+def planned(config_name, value="yes", scope="*", reseller="*", depends_on=()):
+    """A PlannedRequest for one write, as compile_plan would build it."""
+    return compile_task(WriteTask(config_name, value, scope, reseller, tuple(depends_on)), description="test")
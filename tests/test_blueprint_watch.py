@@ -0,0 +1,52 @@
+from types import SimpleNamespace
+
+from helpers import planned
+from utils.blueprint_watch import AppliedRecorder, AppliedSnapshots, diff_plan, last_writes, task_target
+
+def test_first_run_sends_everything():
+    plan = [planned("A", "1"), planned("B", "2")]
+    delta, removed = diff_plan({}, plan)
+    assert delta == plan
+    assert removed == []
+
+def test_unchanged_plan_sends_nothing():
+    plan = [planned("A", "1"), planned("B", "2")]
+    applied = {task_target(request.task): request.task.config_value for request in plan}
+    assert diff_plan(applied, plan) == ([], [])
+
+def test_changed_and_removed_targets():
+    applied = {("A", "*", "*"): "1", ("B", "*", "*"): "2", ("GONE", "*", "*"): "x"}
+    plan = [planned("A", "1"), planned("B", "3"), planned("NEW", "4")]
+    delta, removed = diff_plan(applied, plan)
+    assert [request.task.config_name for request in delta] == ["B", "NEW"]
+    assert removed == [("GONE", "*", "*")]
+
+def test_duplicate_targets_keep_only_the_last_write():
+    plan = [planned("A", "first"), planned("B", "1"), planned("A", "second")]
+    assert [request.task.config_value for request in last_writes(plan)] == ["1", "second"]
+
+    # Snapshotting the collapsed delta makes the next pass over the same blueprint a no-op
+    delta, _ = diff_plan({}, plan)
+    applied = {task_target(request.task): request.task.config_value for request in delta}
+    assert applied[("A", "*", "*")] == "second"
+    assert diff_plan(applied, plan) == ([], [])
+
+def test_same_config_on_other_scopes_is_not_a_duplicate():
+    plan = [planned("A", "1", scope="Super User"), planned("A", "2", scope="Reseller")]
+    assert last_writes(plan) == plan
+
+def test_applied_recorder_keeps_successes_only():
+    applied = {}
+    forwarded = []
+    recorder = AppliedRecorder(applied, SimpleNamespace(record=lambda *args: forwarded.append(args), close=lambda: None))
+    ok, failed = planned("A", "1"), planned("B", "2")
+    recorder.record(ok, SimpleNamespace(response=SimpleNamespace(status_code=202)))
+    recorder.record(failed, SimpleNamespace(response=SimpleNamespace(status_code=500)))
+    recorder.record(planned("C", "3"), error=RuntimeError("reset"))
+    assert applied == {("A", "*", "*"): "1"}
+    assert len(forwarded) == 3
+
+def test_snapshots_survive_a_restart(tmp_path):
+    path = str(tmp_path / "watch_state.json")
+    AppliedSnapshots(path).put("key", {("A", "*", "*"): "1"})
+    assert AppliedSnapshots(path).get("key") == {("A", "*", "*"): "1"}
@@ -0,0 +1,65 @@
+import pytest
+
+from utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, get_breaker
+
+def opened(half_open_probes=1):
+    breaker = CircuitBreaker("api.example.com", failure_threshold=3, reset_seconds=30, half_open_probes=half_open_probes)
+    for _ in range(3):
+        breaker.before_request()
+        breaker.record_failure()
+    return breaker
+
+def reset_elapsed(breaker):
+    breaker.opened_at -= breaker.reset_seconds
+
+def test_consecutive_failures_open_the_circuit():
+    breaker = CircuitBreaker("api.example.com", failure_threshold=3)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker("api.example.com", failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+def test_half_open_lets_one_probe_through_and_closes_on_success():
+    breaker = opened()
+    reset_elapsed(breaker)
+    breaker.before_request()
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()  # Only one probe at a time
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    breaker.before_request()
+
+def test_failed_probe_reopens_the_circuit():
+    breaker = opened()
+    reset_elapsed(breaker)
+    breaker.before_request()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+def test_inconclusive_probe_frees_its_slot():
+    breaker = opened()
+    reset_elapsed(breaker)
+    breaker.before_request()
+    breaker.record_other()
+    breaker.before_request()
+    assert breaker.state == HALF_OPEN
+
+def test_open_error_is_a_connection_error():
+    import requests
+    assert issubclass(CircuitOpenError, requests.exceptions.ConnectionError)
+
+def test_breaker_is_shared_per_host():
+    assert get_breaker("https://API.example.com/") is get_breaker("api.example.com")
@@ -0,0 +1,92 @@
+import threading
+import time
+
+import requests
+
+from helpers import planned
+from utils.cluster_state import ClusterState, get_cluster_state
+
+def record(config_name, value="yes", scope="*", reseller="*", domain="*"):
+    return {"config-name": config_name, "config-value": value, "user-scope": scope, "reseller": reseller, "domain": domain}
+
+class Listing:
+    """Stands in for APIHelper.get on the configurations endpoint; counts the calls."""
+
+    def __init__(self, records=(), status_code=200, error=None, delay=0.0):
+        self.records = list(records)
+        self.status_code = status_code
+        self.error = error
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def get(self, endpoint, timeout=None, use_cache=True):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return type("Response", (), {"status_code": self.status_code, "json": lambda _: self.records})()
+
+def test_listing_marks_global_configs_as_existing():
+    state = ClusterState("api.example.com")
+    assert state.ensure_configurations(Listing([record("A"), record("B", scope="Reseller"), record("C", domain="acme")]))
+    assert state.exists("A") and state.exists("B", scope="Reseller")
+    assert state.exists("B") is None  # Unknown, not "missing"
+    assert state.exists("C") is None
+
+def test_fresh_listing_is_not_fetched_again():
+    state = ClusterState("api.example.com")
+    listing = Listing([record("A")])
+    state.ensure_configurations(listing)
+    state.ensure_configurations(listing)
+    assert listing.calls == 1
+
+def test_entries_expire_after_the_ttl():
+    state = ClusterState("api.example.com", config_ttl=0)
+    listing = Listing([record("A")])
+    state.ensure_configurations(listing)
+    assert state.exists("A") is None
+    state.ensure_configurations(listing)
+    assert listing.calls == 2
+
+def test_concurrent_sessions_share_one_load():
+    state = ClusterState("api.example.com")
+    listing = Listing([record("A")], delay=0.05)
+    threads = [threading.Thread(target=state.ensure_configurations, args=(listing,)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert listing.calls == 1
+    assert state.exists("A")
+
+def test_failed_listing_is_not_retried_right_away():
+    state = ClusterState("api.example.com")
+    listing = Listing(error=requests.exceptions.ReadTimeout("listing too slow"))
+    assert not state.ensure_configurations(listing)
+    assert not state.ensure_configurations(listing)
+    assert listing.calls == 1
+    assert not ClusterState("api.example.com").ensure_configurations(Listing(status_code=403))
+
+def test_record_write_stores_successes_and_forgets_failures():
+    state = ClusterState("api.example.com")
+    state.record_write(planned("A").task, 202)
+    assert state.exists("A")
+    state.record_write(planned("A").task, 500)
+    assert state.exists("A") is None
+    state.record_write(planned("B").task, None)  # Connection error
+    assert state.exists("B") is None
+
+def test_least_recently_used_config_is_evicted():
+    state = ClusterState("api.example.com", max_entries=2)
+    for name in ("A", "B"):
+        state.record_write(planned(name).task, 202)
+    state.exists("A")
+    state.record_write(planned("C").task, 202)
+    assert [name for name in ("A", "B", "C") if state.exists(name)] == ["A", "C"]
+
+def test_state_is_shared_per_cluster_and_token():
+    state = get_cluster_state("https://API.example.com/", "token-a")
+    assert get_cluster_state("api.example.com", "token-a") is state
+    assert get_cluster_state("api.example.com", "token-b") is not state
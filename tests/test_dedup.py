@@ -0,0 +1,50 @@
+import json
+
+from helpers import planned
+from ui_configs import prepare_plan, split_shared_writes
+
+ANSWERS = {"include_resellers": "yes", "include_css_colors": "no", "values": {}}
+
+def test_writes_common_to_every_plan_are_shared():
+    shared_a, shared_b = planned("A"), planned("B")
+    plans = [(shared_a, planned("C", "one"), shared_b), (shared_b, planned("C", "two"), shared_a)]
+    shared, specific = split_shared_writes(plans)
+    assert shared == (shared_a, shared_b)  # In first-plan order
+    assert [[request.task.config_value for request in plan] for plan in specific] == [["one"], ["two"]]
+
+def test_single_plan_is_all_shared():
+    plan = (planned("A"), planned("B"))
+    assert split_shared_writes([plan]) == (plan, [()])
+
+def test_common_write_after_a_custid_write_to_the_same_target_stays_last(tmp_path):
+    blueprint = tmp_path / "blueprint.json"
+    blueprint.write_text(json.dumps([{"config_name": "PORTAL_X", "config_value": "custID-support"},
+                                     {"config_name": "PORTAL_X", "config_value": "generic"}]))
+    plans = [prepare_plan(str(blueprint), customer, ANSWERS) for customer in ("sgdemo", "acme")]
+    shared, specific = split_shared_writes(plans)
+    assert shared == ()
+    assert [[request.task.config_value for request in plan] for plan in specific] == [["sgdemo-support", "generic"], ["acme-support", "generic"]]
+
+def test_writes_depending_on_a_custid_write_stay_with_the_customer():
+    plans = [(planned("A", customer), planned("B", depends_on=("A",)), planned("C", depends_on=("B",)), planned("OTHER"))
+             for customer in ("sgdemo", "acme")]
+    shared, specific = split_shared_writes(plans)
+    assert [request.task.config_name for request in shared] == ["OTHER"]
+    assert [[request.task.config_name for request in plan] for plan in specific] == [["A", "B", "C"]] * 2
+
+def test_custid_entries_stay_customer_specific(tmp_path):
+    blueprint = tmp_path / "blueprint.json"
+    blueprint.write_text(json.dumps([
+        {"config_name": "PORTAL_WEBPHONE_ENABLE_PWA", "config_value": "yes"},
+        {"config_name": "PORTAL_WEBPHONE_PWA_NAME", "config_value": "custID Phone"},
+        {"config_name": "PORTAL_THEME", "config_value": "dark", "scopes": "su,res"},
+    ]))
+    plans = [prepare_plan(str(blueprint), customer, ANSWERS) for customer in ("sgdemo", "acme")]
+    shared, specific = split_shared_writes(plans)
+    assert [(request.task.config_name, request.task.scope) for request in shared] == [
+        ("PORTAL_WEBPHONE_ENABLE_PWA", "*"), ("PORTAL_THEME", "Super User"), ("PORTAL_THEME", "Reseller")]
+    assert [[request.task.config_value for request in plan] for plan in specific] == [["sgdemo Phone"], ["acme Phone"]]
+    # Nothing is lost or sent twice per customer
+    for plan, remainder in zip(plans, specific):
+        assert len(plan) == len(shared) + len(remainder)
+        assert set(plan) == set(shared) | set(remainder)
@@ -0,0 +1,39 @@
+import time
+
+from helpers import planned
+from utils.history import TransactionHistory, TransactionRecorder
+
+def response(status_code):
+    return type("Response", (), {"status_code": status_code})()
+
+def result(status_code):
+    return type("Result", (), {"response": response(status_code), "verb": "POST", "elapsed": 0.01})()
+
+def test_runs_summary_tracks_batches(tmp_path):
+    history = TransactionHistory(str(tmp_path / "history.db"))
+    recorder = TransactionRecorder(history, "run-1", "https://API.example.com/", "acme", batch_size=2)
+    for status_code in (202, 500, 201):
+        recorder.record(planned("A"), result(status_code))
+    recorder.record(planned("B"), error=RuntimeError("reset"))
+    recorder.close()
+    [run] = history.list_runs()
+    assert (run["run_id"], run["cluster"], run["customer"], run["writes"], run["failed"]) == ("run-1", "api.example.com", "acme", 4, 2)
+    assert run["started_at"] <= run["finished_at"]
+
+def test_cluster_filter_accepts_host_or_url(tmp_path):
+    history = TransactionHistory(str(tmp_path / "history.db"))
+    recorder = TransactionRecorder(history, "run-1", "api.example.com")
+    recorder.record(planned("A"), result(202))
+    recorder.close()
+    assert len(history.query(cluster="https://api.example.com")) == 1
+    assert history.list_runs()[0]["customer"] is None
+
+def test_replace_run_is_idempotent(tmp_path):
+    history = TransactionHistory(str(tmp_path / "history.db"))
+    rows = [{"run_id": "rollout-1", "ts": time.time(), "cluster": "api.example.com", "customer": "acme", "config_name": name,
+             "scope": "*", "reseller": "*", "config_value": "yes", "verb": "POST", "status": 202, "ok": 1,
+             "error": None, "latency": 0.01} for name in ("A", "B")]
+    history.replace_run("rollout-1", rows)
+    history.replace_run("rollout-1", rows)
+    assert len(history.query(run_id="rollout-1")) == 2
+    assert [run["writes"] for run in history.list_runs()] == [2]
@@ -0,0 +1,94 @@
+import logging
+
+import requests
+
+from utils.api_helper import APIHelper
+from utils.circuit_breaker import CircuitBreaker
+from utils.http_cache import ResponseCache, get_shared_cache
+
+DOMAINS = "ns-api/v2/domains"
+
+class Response:
+    def __init__(self, status_code, body="", etag=None):
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.text = body
+        self.headers = {"ETag": etag} if etag else {}
+
+def fake_server(monkeypatch, responses):
+    """Answers requests.request with responses in order; returns the list of (method, url, headers) sent."""
+    sent = []
+
+    def request(method, url, headers=None, **kwargs):
+        sent.append((method, url, dict(headers or {})))
+        return responses.pop(0)
+
+    monkeypatch.setattr(requests, "request", request)
+    return sent
+
+def api_helper(cache):
+    return APIHelper("https://api.example.com", "token-1234567890", logger=logging.getLogger("test"), hooks=(),
+                     cache=cache, breaker=CircuitBreaker("test"))
+
+def test_only_endpoints_with_a_ttl_and_200_answers_are_stored():
+    cache = ResponseCache(ttl_rules=((DOMAINS, 60),))
+    cache.store("ns-api/v2/other", Response(200))
+    cache.store(DOMAINS, Response(500))
+    assert cache.lookup("ns-api/v2/other") is None and cache.lookup(DOMAINS) is None
+    cache.store(DOMAINS, Response(200, "[]"))
+    assert cache.lookup(DOMAINS).is_fresh
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_entries=2, default_ttl=60)
+    for endpoint in ("a", "b"):
+        cache.store(endpoint, Response(200))
+    cache.lookup("a")
+    cache.store("c", Response(200))
+    assert [endpoint for endpoint in ("a", "b", "c") if cache.lookup(endpoint)] == ["a", "c"]
+
+def test_expired_entry_without_etag_is_dropped():
+    cache = ResponseCache(default_ttl=60)
+    cache.store("a", Response(200))
+    cache.lookup("a").expires_at = 0
+    assert cache.lookup("a") is None
+    assert cache.stats()["entries"] == 0
+
+def test_fresh_entry_is_served_without_a_request(monkeypatch):
+    sent = fake_server(monkeypatch, [Response(200, "[1]")])
+    api = api_helper(ResponseCache())
+    first = api.get(DOMAINS)
+    assert api.get(DOMAINS) is first
+    assert len(sent) == 1
+
+def test_expired_entry_is_revalidated_with_its_etag(monkeypatch):
+    sent = fake_server(monkeypatch, [Response(200, "[1]", etag='"v1"'), Response(304)])
+    cache = ResponseCache()
+    api = api_helper(cache)
+    first = api.get(DOMAINS)
+    cache.lookup(DOMAINS).expires_at = 0
+    assert api.get(DOMAINS) is first
+    assert sent[1][2]["If-None-Match"] == '"v1"'
+    assert cache.lookup(DOMAINS).is_fresh
+    assert cache.stats()["revalidations"] == 1
+
+def test_changed_resource_replaces_the_entry(monkeypatch):
+    fake_server(monkeypatch, [Response(200, "[1]", etag='"v1"'), Response(200, "[2]", etag='"v2"')])
+    cache = ResponseCache()
+    api = api_helper(cache)
+    api.get(DOMAINS)
+    cache.lookup(DOMAINS).expires_at = 0
+    assert api.get(DOMAINS).text == "[2]"
+    assert cache.lookup(DOMAINS).etag == '"v2"'
+
+def test_successful_write_drops_cached_reads_under_its_endpoint(monkeypatch):
+    fake_server(monkeypatch, [Response(200, "[1]"), Response(202)])
+    cache = ResponseCache()
+    api = api_helper(cache)
+    api.get(DOMAINS + "?limit=100&start=0")
+    api.post(DOMAINS, {"domain": "acme"}, timeout=5)
+    assert cache.stats()["entries"] == 0
+
+def test_shared_cache_is_per_cluster_and_token():
+    cache = get_shared_cache("https://API.example.com/", "token-a")
+    assert get_shared_cache("api.example.com", "token-a") is cache
+    assert get_shared_cache("api.example.com", "token-b") is not cache
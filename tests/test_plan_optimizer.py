@@ -0,0 +1,28 @@
+from utils.config_items import ConfigItem
+from utils.plan_optimizer import optimize_items
+
+ALL_SCOPES = ("Super User", "Reseller", "Office Manager")
+
+def test_full_scope_fan_out_collapses_to_default_scope():
+    items = [ConfigItem("A", "1", scopes=ALL_SCOPES), ConfigItem("B", "2", scopes=("Reseller",))]
+    optimized, report = optimize_items(items, ALL_SCOPES)
+    assert [item.scopes for item in optimized] == [(), ("Reseller",)]
+    assert (report.writes_before, report.writes_after, report.collapsed, report.merged) == (4, 2, 2, 0)
+    assert report.saved == 2
+
+def test_last_write_to_a_target_wins_at_its_own_position():
+    items = [ConfigItem("A", "old"), ConfigItem("B", "1"), ConfigItem("A", "new")]
+    optimized, report = optimize_items(items, ALL_SCOPES)
+    assert [(item.config_name, item.config_value) for item in optimized] == [("B", "1"), ("A", "new")]
+    assert report.merged == 1
+
+def test_partially_overwritten_entry_keeps_its_other_scopes():
+    items = [ConfigItem("A", "1", scopes=("Super User", "Reseller")), ConfigItem("A", "2", scopes=("Reseller",))]
+    optimized, _ = optimize_items(items, ALL_SCOPES)
+    assert [(item.config_value, item.scopes) for item in optimized] == [("1", ("Super User",)), ("2", ("Reseller",))]
+
+def test_resellers_are_separate_targets():
+    items = [ConfigItem("A", "1", reseller="r1"), ConfigItem("A", "2", reseller="r2")]
+    optimized, report = optimize_items(items, ALL_SCOPES)
+    assert optimized == items
+    assert report.saved == 0
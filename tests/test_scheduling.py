@@ -0,0 +1,71 @@
+import threading
+
+import pytest
+
+from helpers import planned
+from utils.scheduling import build_dependency_graph, execute_dag, prerequisites_for, topological_waves
+
+def names(plan, indexes):
+    return [plan[index].task.config_name for index in indexes]
+
+def test_prerequisites_match_patterns_and_declared_names():
+    assert prerequisites_for("PORTAL_WEBPHONE_PWA_NAME") == {"PORTAL_WEBPHONE_ENABLE_PWA"}
+    assert prerequisites_for("X", declared=("Y",)) == {"Y"}
+    assert prerequisites_for("PORTAL_WEBPHONE_ENABLE_PWA") == set()
+
+def test_waves_put_prerequisites_first():
+    plan = [planned("PORTAL_WEBPHONE_PWA_NAME"), planned("OTHER"), planned("PORTAL_WEBPHONE_ENABLE_PWA")]
+    waves = topological_waves(plan, build_dependency_graph(plan))
+    assert [names(plan, wave) for wave in waves] == [["OTHER", "PORTAL_WEBPHONE_ENABLE_PWA"], ["PORTAL_WEBPHONE_PWA_NAME"]]
+
+def test_prerequisite_not_in_plan_is_assumed_in_place():
+    plan = [planned("PORTAL_WEBPHONE_PWA_NAME")]
+    assert topological_waves(plan, build_dependency_graph(plan)) == [[0]]
+
+def test_repeated_target_keeps_blueprint_order():
+    plan = [planned("A", "1"), planned("A", "2")]
+    assert topological_waves(plan, build_dependency_graph(plan)) == [[0], [1]]
+
+def test_cycle_is_rejected():
+    plan = [planned("A", depends_on=("B",)), planned("B", depends_on=("A",))]
+    with pytest.raises(ValueError, match="cycle"):
+        topological_waves(plan, build_dependency_graph(plan))
+
+def test_execute_dag_sends_every_write_after_its_prerequisites():
+    plan = [planned("PORTAL_WEBPHONE_PWA_NAME"), planned("PORTAL_WEBPHONE_PWA_SHORT_NAME"),
+            planned("PORTAL_WEBPHONE_ENABLE_PWA"), planned("OTHER")]
+    sent = []
+    lock = threading.Lock()
+
+    def send(request):
+        with lock:
+            sent.append(request.task.config_name)
+        return True
+
+    assert execute_dag(plan, build_dependency_graph(plan), send, max_workers=4) == ([], [])
+    assert sorted(sent) == sorted(request.task.config_name for request in plan)
+    assert sent.index("PORTAL_WEBPHONE_ENABLE_PWA") < sent.index("PORTAL_WEBPHONE_PWA_NAME")
+    assert sent.index("PORTAL_WEBPHONE_ENABLE_PWA") < sent.index("PORTAL_WEBPHONE_PWA_SHORT_NAME")
+
+def test_failed_prerequisite_skips_dependents():
+    plan = [planned("PORTAL_WEBPHONE_ENABLE_PWA"), planned("PORTAL_WEBPHONE_PWA_NAME"), planned("OTHER")]
+    failed, skipped = execute_dag(plan, build_dependency_graph(plan), lambda request: request.task.config_name != "PORTAL_WEBPHONE_ENABLE_PWA")
+    assert names(plan, failed) == ["PORTAL_WEBPHONE_ENABLE_PWA"]
+    assert names(plan, skipped) == ["PORTAL_WEBPHONE_PWA_NAME"]
+
+def test_failed_earlier_write_to_same_target_does_not_skip_the_later_one():
+    plan = [planned("A", "1"), planned("A", "2")]
+    failed, skipped = execute_dag(plan, build_dependency_graph(plan), lambda request: request.task.config_value == "2")
+    assert (failed, skipped) == ([0], [])
+
+def test_exception_stops_new_writes_and_is_raised():
+    plan = [planned("PORTAL_WEBPHONE_ENABLE_PWA"), planned("PORTAL_WEBPHONE_PWA_NAME")]
+    sent = []
+
+    def send(request):
+        sent.append(request.task.config_name)
+        raise ConnectionError("cluster down")
+
+    with pytest.raises(ConnectionError):
+        execute_dag(plan, build_dependency_graph(plan), send)
+    assert sent == ["PORTAL_WEBPHONE_ENABLE_PWA"]
@@ -0,0 +1,86 @@
+import time
+
+import pytest
+
+from utils.sharding import SHARED_UNIT, ShardJournal, merge_shards, parse_shard, shard_of, shard_units, work_units
+
+CLUSTERS = ["https://api.a.example.com", "https://api.b.example.com", "https://api.c.example.com"]
+CUSTOMERS = ["sgdemo", "acme", "globex", "initech"]
+
+def write_row(run_id, cluster, customer, name, ok=True):
+    return {"run_id": run_id, "ts": time.time(), "cluster": cluster, "customer": customer, "config_name": name,
+            "scope": "*", "reseller": "*", "config_value": "yes", "verb": "POST",
+            "status": 202 if ok else 500, "ok": int(ok), "error": None, "latency": 0.01}
+
+def journal(path, index, count, run_id="rollout-1", rows=(), finish=True):
+    shard = ShardJournal(str(path), index, count, run_id)
+    shard.record_many(list(rows))
+    if finish:
+        shard.close()
+    return str(path)
+
+def test_parse_shard():
+    assert parse_shard("2/4") == (2, 4)
+    for spec in ("0/4", "5/4", "x", "1/0"):
+        with pytest.raises(ValueError):
+            parse_shard(spec)
+
+def test_shard_of_ignores_url_form():
+    assert shard_of("https://API.a.example.com/", "acme", 7) == shard_of("api.a.example.com", "acme", 7)
+
+def test_shards_partition_the_units():
+    units = work_units(CLUSTERS, CUSTOMERS)
+    split = [shard_units(units, index, 3) for index in (1, 2, 3)]
+    assert sorted(unit for part in split for unit in part) == sorted(units)
+
+def test_shared_unit_runs_first_on_every_shard_with_customers_of_the_cluster():
+    units = work_units(CLUSTERS, CUSTOMERS, shared=True)
+    split = [shard_units(units, index, 3) for index in (1, 2, 3)]
+    for mine in split:
+        for cluster in {unit[0] for unit in mine}:
+            assert [unit for unit in mine if unit[0] == cluster][0] == (cluster, SHARED_UNIT)
+
+def test_single_cluster_is_spread_over_every_shard():
+    customers = [f"customer{number}" for number in range(100)]
+    units = work_units(CLUSTERS[:1], customers, shared=True)
+    split = [shard_units(units, index, 4) for index in (1, 2, 3, 4)]
+    assert all(len(mine) > 1 and mine[0] == (CLUSTERS[0], SHARED_UNIT) for mine in split)
+    assert sum(len(mine) - 1 for mine in split) == 100
+
+def test_merge_combines_complete_shards(tmp_path):
+    cluster = "api.a.example.com"
+    first = journal(tmp_path / "s1.jsonl", 1, 2, rows=[write_row("rollout-1", cluster, "acme", "A"),
+                                                     write_row("rollout-1", cluster, "acme", "B", ok=False)])
+    second = journal(tmp_path / "s2.jsonl", 2, 2, rows=[write_row("rollout-1", cluster, "globex", "A")])
+    merged = merge_shards([second, first])
+    assert merged["run_id"] == "rollout-1"
+    assert [shard["index"] for shard in merged["shards"]] == [1, 2]
+    assert merged["missing"] == [] and merged["unfinished"] == []
+    assert len(merged["writes"]) == 3
+    assert [row["config_name"] for row in merged["failed"]] == ["B"]
+    assert merged["clusters"] == {cluster: {"writes": 3, "failed": 1}}
+
+def test_merge_reports_missing_and_unfinished_shards(tmp_path):
+    first = journal(tmp_path / "s1.jsonl", 1, 3)
+    second = journal(tmp_path / "s2.jsonl", 2, 3, finish=False)
+    merged = merge_shards([first, second])
+    assert merged["missing"] == [3]
+    assert merged["unfinished"] == [2]
+
+@pytest.mark.parametrize("other", [
+    {"index": 2, "count": 3},  # Different N
+    {"index": 1, "count": 2},  # Same shard twice
+    {"index": 2, "count": 2, "run_id": "rollout-2"},  # Different run
+])
+def test_merge_rejects_inconsistent_sets(tmp_path, other):
+    first = journal(tmp_path / "s1.jsonl", 1, 2)
+    second = journal(tmp_path / "other.jsonl", **other)
+    with pytest.raises(ValueError):
+        merge_shards([first, second])
+
+def test_truncated_journal_is_rejected(tmp_path):
+    path = journal(tmp_path / "s1.jsonl", 1, 1)
+    with open(path, "a") as f:
+        f.write('{"type": "wri')
+    with pytest.raises(ValueError, match="truncated"):
+        merge_shards([path])
@@ -0,0 +1,53 @@
+import pytest
+
+from ui_configs import RunOptions, start_deadline
+from utils.timeouts import (DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT, MIN_CONNECT_TIMEOUT, MIN_READ_TIMEOUT,
+                            DeadlineExceeded, LatencyTracker, RunDeadline, cap_timeouts)
+
+def test_defaults_apply_until_enough_samples():
+    tracker = LatencyTracker(min_samples=5)
+    for _ in range(4):
+        tracker.record(0.1)
+    assert tracker.timeouts() == (DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT)
+
+def test_timeouts_follow_observed_latency():
+    tracker = LatencyTracker(min_samples=5, multiplier=3.0)
+    for seconds in (1.0, 1.0, 1.0, 1.0, 2.0):
+        tracker.record(seconds)
+    assert tracker.timeouts() == (min(DEFAULT_CONNECT_TIMEOUT, 3.0), 6.0)
+
+def test_timeouts_are_clamped():
+    fast = LatencyTracker(min_samples=1)
+    fast.record(0.01)
+    assert fast.timeouts() == (MIN_CONNECT_TIMEOUT, MIN_READ_TIMEOUT)
+    slow = LatencyTracker(min_samples=1)
+    slow.record(100.0)
+    assert slow.timeouts() == (DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT)
+
+def test_window_drops_old_samples():
+    tracker = LatencyTracker(window=3, min_samples=3)
+    for seconds in (50.0, 1.0, 1.0, 1.0):
+        tracker.record(seconds)
+    assert tracker.percentile(99) == 1.0
+
+def test_cap_timeouts_without_deadline_only_normalizes():
+    assert cap_timeouts(10) == (10, 10)
+    assert cap_timeouts((5, 30)) == (5, 30)
+
+def test_cap_timeouts_by_remaining_budget():
+    connect, read = cap_timeouts((5, 30), RunDeadline(10))
+    assert connect == 5 and 9 < read <= 10
+
+def test_spent_deadline_raises_a_timeout():
+    import requests
+    with pytest.raises(requests.exceptions.Timeout):
+        cap_timeouts((5, 30), RunDeadline(0))
+    assert issubclass(DeadlineExceeded, requests.exceptions.Timeout)
+
+def test_deadline_clock_starts_when_sending_starts():
+    options = RunOptions(deadline_seconds=60)
+    assert options.deadline is None
+    started = start_deadline(options)
+    assert 59 < started.deadline.remaining() <= 60
+    assert start_deadline(started) is started  # Later plans of the same run share it
+    assert start_deadline(RunOptions()).deadline is None
@@ -1,14 +1,25 @@
-import time
 import os
-from utils.logging_setup import setup_logging
-from utils.api_helper import APIHelper
-from utils.env_loader import load_env
-from utils.validators import validate_url, validate_hex_color, validate_yes_no, validate_numeric_range, validate_non_empty_string, load_json_config, validate_scope
+import json
+from dataclasses import dataclass, replace
+from utils.logging_setup import setup_logging, get_logger
+from utils.env_loader import load_env, get_cluster_token
+from utils.config_items import ConfigItem, DEFAULT_SCOPE
+from utils.request_plan import compile_plan, execute_planned_request
+from utils.cluster_state import get_cluster_state
+from utils.validators import validate_url, validate_hex_color, validate_yes_no, validate_numeric_range, validate_non_empty_string, load_json_config, validate_scope, validate_file_path
 
-logger = setup_logging()
-env_vars = load_env()
-API_TOKEN = env_vars["API_TOKEN"]
-logger.info(f"Loaded API_TOKEN: {API_TOKEN}")
+# Handlers, the log directory and the .env file are only touched on first use (see setup_logging / get_api_token)
+logger = get_logger()
+_api_tokens = {}
+
+def get_api_token(api_url=None):
+    """Loads the token for api_url (API_TOKEN_<HOST>, falling back to API_TOKEN) once, on first use."""
+    if api_url not in _api_tokens:
+        token = get_cluster_token(load_env(), api_url)
+        token_preview = token[:10] + "..." if token and len(token) > 10 else "******"
+        logger.info(f"Loaded API token for {api_url or 'default cluster'}: {token_preview}")
+        _api_tokens[api_url] = token
+    return _api_tokens[api_url]
 
 SCOPE_MAPPING = {
     "su": "Super User",
@@ -57,15 +68,8 @@ STRING_CONFIGS = [
     "EMAIL_HTML_GET_SUPPORT_LINK"
 ]
 
-common_payload = {
-    "admin-ui-account-type": "*",
-    "reseller": "*",
-    "user": "*",
-    "user-scope": "*",
-    "core-server": "*",
-    "domain": "*",
-    "description": "Created via API"
-}
+# Stamped on every write from the CLI (the rest of the payload comes from utils.request_plan)
+WRITE_DESCRIPTION = "Created via API"
 
 def prompt_for_color(config_name, current_value, default_value):
     while True:
@@ -106,59 +110,264 @@ def prompt_for_string(config_name, current_value):
             print(f"Error: {e}")
             logger.warning(f"Invalid string input for {config_name}: {new_value}")
 
-def send_configuration(config, api_url, scope=None):
-    payload = common_payload.copy()
-    payload["config-name"] = config["config_name"]
-    payload["config-value"] = config["config_value"]
-    
-    if scope:
-        payload["user-scope"] = scope
-    
-    if "reseller" in config:
-        payload["reseller"] = config["reseller"]
-    
-    api_helper = APIHelper(api_url, logger=logger)
-    endpoint = "ns-api/v2/configurations"
+# --- HEADLESS MODE: ANSWERS FILE + UP-FRONT VALIDATION ---
+def load_answers(answers_file):
+    """
+    Loads a headless answers file.
+
+    Expected shape:
+        {
+            "include_resellers": "yes" | "no",
+            "include_css_colors": "yes" | "no",
+            "values": {"PORTAL_CSS_PRIMARY_1": "#123abc", ...}
+        }
+    """
+    validate_file_path(answers_file, logger=logger)
+    try:
+        with open(answers_file, 'r') as f:
+            answers = json.load(f)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON in answers file {answers_file}: {str(e)}")
+    if not isinstance(answers, dict):
+        raise ValueError(f"Answers file {answers_file} must contain a JSON object.")
+    if not isinstance(answers.get("values", {}), dict):
+        raise ValueError(f"'values' in {answers_file} must be an object of config_name -> value.")
+    logger.info(f"Loaded answers from {answers_file}")
+    return answers
+
+def validate_config_value(config_name, value):
+    """Runs the same validator the interactive prompt for config_name would use."""
+    value = str(value).strip()
+    if config_name in UI_CONFIG_PROMPT_COLOR_HEX:
+        return validate_hex_color(value, logger=logger)
+    elif config_name in YES_NO_CONFIGS:
+        return validate_yes_no(value, logger=logger)
+    elif config_name in NUMERIC_CONFIGS:
+        return validate_numeric_range(value, 0, 9, logger=logger)
+    elif config_name in STRING_CONFIGS:
+        return validate_non_empty_string(value, config_name, logger=logger)
+    raise ValueError(f"{config_name} is not a prompted configuration.")
+
+def is_prompted_config(config_name):
+    return (config_name in UI_CONFIG_PROMPT_COLOR_HEX or config_name in YES_NO_CONFIGS
+            or config_name in NUMERIC_CONFIGS or config_name in STRING_CONFIGS)
+
+def resolve_headless_values(items, answers, include_css_colors):
+    """
+    Validates every answer before any API call is made.
+
+    Prompted configs without an answer keep their blueprint value, which must also pass validation.
+    All problems are collected and raised together as a single ValueError.
+    """
+    provided = answers.get("values", {})
+    resolved = {}
+    errors = []
+
+    for config_name in provided:
+        if not is_prompted_config(config_name):
+            errors.append(f"{config_name}: not a prompted configuration")
+
+    for item in items:
+        config_name = item.config_name
+        if item.is_reseller or not is_prompted_config(config_name):
+            continue
+        if config_name in UI_CONFIG_PROMPT_COLOR_HEX and not include_css_colors:
+            continue
+        raw_value = provided.get(config_name, item.config_value)
+        try:
+            resolved[config_name] = validate_config_value(config_name, raw_value)
+        except ValueError as e:
+            errors.append(f"{config_name}: {e}")
+
+    if errors:
+        for error in errors:
+            logger.error(f"Invalid headless answer - {error}")
+        raise ValueError("Invalid headless answers:\n  " + "\n  ".join(errors))
+    return resolved
+
+def resolve_gatekeeper(answers, key):
+    if key not in answers:
+        raise ValueError(f"Headless mode requires '{key}' (yes/no) in the answers file or on the command line.")
+    return validate_yes_no(str(answers[key]), logger=logger) == "yes"
+
+@dataclass(frozen=True)
+class RunOptions:
+    """How a run sends and records its writes; built once from the command line and passed down."""
+    hooks: tuple = None  # None means "use the hooks enabled via environment variables"
+    deadline_seconds: float = None  # Overall budget; the clock starts when sending starts (see start_deadline)
+    deadline: object = None  # The running RunDeadline capping every request's timeout
+    run_id: str = None  # None means this process's run id (see get_run_id)
+    history: bool = True
+    max_parallel: int = 1
+    optimize: bool = False
+    deduplicate: bool = True
+    journal: object = None  # ShardJournal while running a --shard; replaces the local history
+
+DEFAULT_RUN_OPTIONS = RunOptions()
+
+class PlanFailedError(Exception):
+    """Raised after a run in which some writes did not get a 2xx answer; failed holds those PlannedRequests."""
+
+    def __init__(self, message, failed=()):
+        super().__init__(message)
+        self.failed = list(failed)
+
+_api_helpers = {}
+_process_run_id = None
+
+def get_api_helper(api_url, options=DEFAULT_RUN_OPTIONS):
+    """Returns one APIHelper per cluster (and hooks/deadline) for the life of the process."""
+    key = (api_url, options.hooks, options.deadline)
+    if key not in _api_helpers:
+        # Deferred so that --help, answer validation and other short invocations never import requests
+        from utils.api_helper import APIHelper
+        from utils.http_cache import get_shared_cache
+        token = get_api_token(api_url)
+        _api_helpers[key] = APIHelper(api_url, token, logger=logger, hooks=options.hooks,
+                                      cache=get_shared_cache(api_url, token), deadline=options.deadline)
+    return _api_helpers[key]
+
+def start_deadline(options):
+    """
+    Starts the run's deadline clock, once prompts and rendering are done.
+
+    Returns options with a RunDeadline of options.deadline_seconds; options unchanged when
+    there is no budget or the clock is already running (a multi-customer run shares one deadline).
+    """
+    if not options.deadline_seconds or options.deadline is not None:
+        return options
+    from utils.timeouts import RunDeadline
+    return replace(options, deadline=RunDeadline(options.deadline_seconds))
+
+def get_run_id(options=DEFAULT_RUN_OPTIONS):
+    """The run id stamped on every write in the transaction history: options.run_id, else one id per process."""
+    global _process_run_id
+    if options.run_id:
+        return options.run_id
+    if _process_run_id is None:
+        from utils.history import new_run_id
+        _process_run_id = new_run_id()
+    return _process_run_id
+
+def open_recorder(api_url, customer_name=None, options=DEFAULT_RUN_OPTIONS):
+    """Returns a TransactionRecorder for this run (into the shard journal during --shard), or None when history is disabled."""
+    from utils.history import TransactionHistory, TransactionRecorder
+    if options.journal is not None:
+        return TransactionRecorder(options.journal, get_run_id(options), api_url, customer_name)
+    if not options.history:
+        return None
+    return TransactionRecorder(TransactionHistory(), get_run_id(options), api_url, customer_name)
+
+def send_configuration(request, api_url, recorder=None, options=DEFAULT_RUN_OPTIONS):
+    """Sends one PlannedRequest (POST, then PUT on 409), reports the status codes and records the outcome."""
+    task = request.task
+    config_name = task.config_name
+    scope_label = task.scope if task.scope != DEFAULT_SCOPE else 'Default'
     
     try:
-        start_time = time.time()
-        response = api_helper.post(endpoint, payload)
-        elapsed_time = time.time() - start_time
-        logger.info(f"Sending configuration {config['config_name']} took {elapsed_time:.2f} seconds")
-        
-        print(f"POST status code for {config['config_name']} (Scope: {scope if scope else 'Default'}, Reseller: {payload['reseller']}): {response.status_code}")
-        logger.info(f"POST status code for {config['config_name']} (Scope: {scope if scope else 'Default'}, Reseller: {payload['reseller']}): {response.status_code}")
+        result = execute_planned_request(get_api_helper(api_url, options), request, state=get_cluster_state(api_url, get_api_token(api_url)))
+        if recorder is not None:
+            recorder.record(request, result)
+        logger.info(f"Sending configuration {config_name} took {result.elapsed:.2f} seconds")
         
-        if response.status_code == 409:
-            logger.info(f"Conflict detected for {config['config_name']}, attempting PUT request")
-            start_time = time.time()
-            response = api_helper.put(endpoint, payload)
-            elapsed_time = time.time() - start_time
-            logger.info(f"PUT request for {config['config_name']} took {elapsed_time:.2f} seconds")
-            print(f"PUT status code for {config['config_name']} (Scope: {scope if scope else 'Default'}, Reseller: {payload['reseller']}): {response.status_code}")
-            logger.info(f"PUT status code for {config['config_name']} (Scope: {scope if scope else 'Default'}, Reseller: {payload['reseller']}): {response.status_code}")
+        if result.conflict:
+            print(f"POST status code for {config_name} (Scope: {scope_label}, Reseller: {task.reseller}): 409")
+            logger.info(f"Conflict detected for {config_name}, sent PUT request")
+        elif result.verb == "PUT":
+            logger.info(f"{config_name} is known to exist on {api_url}, sent PUT request directly")
+        print(f"{result.verb} status code for {config_name} (Scope: {scope_label}, Reseller: {task.reseller}): {result.response.status_code}")
+        logger.info(f"{result.verb} status code for {config_name} (Scope: {scope_label}, Reseller: {task.reseller}): {result.response.status_code}")
         
-        return response.status_code
+        return result.response.status_code
     except Exception as e:
-        logger.error(f"Error sending configuration {config['config_name']}: {str(e)}")
+        if recorder is not None:
+            recorder.record(request, error=e)
+        logger.error(f"Error sending configuration {config_name}: {str(e)}")
         raise
 
+def execute_plan(plan, api_url, recorder=None, options=DEFAULT_RUN_OPTIONS):
+    """
+    Sends every PlannedRequest in order; the loop does no payload building or serialization.
 
-def update_configurations(customer_name=None, config_file=os.path.join("config", "ui_configs.json"), api_url=None):
-    print(f"Using API URL: {api_url}")
-    logger.info(f"Using API URL: {api_url}")
+    Returns the requests that did not get a 2xx answer. With --parallel above 1 the plan is
+    sent as a dependency DAG instead (see execute_plan_parallel).
+    """
+    # Which configs exist is read (best-effort) once per plan, never between writes
+    get_cluster_state(api_url, get_api_token(api_url)).ensure_configurations(get_api_helper(api_url, options), logger=logger)
+    if options.max_parallel > 1:
+        return execute_plan_parallel(plan, api_url, recorder, options)
+    from utils.circuit_breaker import CircuitOpenError
+    failed = []
+    for index, request in enumerate(plan):
+        try:
+            status_code = send_configuration(request, api_url, recorder, options)
+            if not 200 <= status_code < 300:
+                failed.append(request)
+        except CircuitOpenError:
+            remaining = len(plan) - index
+            print(f">> {api_url} is not answering: skipping the remaining {remaining} write(s).")
+            logger.error(f"Circuit open for {api_url}; skipped {remaining} remaining write(s)")
+            raise
+    return failed
 
-    # --- 1. ASK ABOUT RESELLER CONFIGS ---
-    include_resellers = False
-    
+def execute_plan_parallel(plan, api_url, recorder=None, options=DEFAULT_RUN_OPTIONS):
+    """
+    Sends the plan on options.max_parallel threads, each write starting once its prerequisite configs are written.
+
+    Returns the requests that failed or were skipped because a prerequisite failed.
+    Raises ValueError (before any write) if the declared dependencies form a cycle.
+    """
+    from utils.circuit_breaker import CircuitOpenError
+    from utils.scheduling import build_dependency_graph, topological_waves, execute_dag
+    prerequisites = build_dependency_graph(plan)
+    waves = topological_waves(plan, prerequisites)
+    print(f">> Sending {len(plan)} writes in {len(waves)} dependency wave(s), up to {options.max_parallel} at a time")
+    logger.info(f"Parallel plan for {api_url}: {len(plan)} writes, {len(waves)} waves, {options.max_parallel} workers")
+    get_api_helper(api_url, options)  # Created once here rather than raced for by the worker threads
+
+    send = lambda request: 200 <= send_configuration(request, api_url, recorder, options) < 300
+    try:
+        failed, skipped = execute_dag(plan, prerequisites, send, max_workers=options.max_parallel)
+    except CircuitOpenError:
+        print(f">> {api_url} is not answering: stopped sending the remaining writes.")
+        logger.error(f"Circuit open for {api_url}; stopped the parallel plan")
+        raise
+    for index in skipped:
+        task = plan[index].task
+        print(f">> Skipped {task.config_name} (Scope: {task.scope}, Reseller: {task.reseller}): a prerequisite write failed")
+        logger.warning(f"Skipped {task.config_name} (Scope: {task.scope}): a prerequisite write failed")
+    return [plan[index] for index in sorted(failed + skipped)]
+
+def ask_gatekeeper(question):
     while True:
-        user_input = input("Do you want to apply Reseller-specific configs? (yes/no): ").strip()
+        user_input = input(f"{question} (yes/no): ").strip()
         try:
-            validated_response = validate_yes_no(user_input, logger=logger)
-            include_resellers = (validated_response == "yes")
-            break
+            return validate_yes_no(user_input, logger=logger) == "yes"
         except ValueError:
             print("Invalid input. Please enter 'yes' or 'no'.")
+
+def update_configurations(customer_name=None, config_file=os.path.join("config", "ui_configs.json"), api_url=None, answers=None, verify=False, options=DEFAULT_RUN_OPTIONS):
+    """
+    Applies the blueprint to api_url.
+
+    When answers is None the gatekeepers and prompted values are read interactively.
+    Otherwise the run is headless: everything comes from answers and is validated before the first write.
+    With verify=True the cluster is re-read once afterwards and the VerificationReport is returned.
+    Every write outcome is recorded in the transaction history under get_run_id(options).
+
+    Raises:
+        PlanFailedError: If any write failed (after the optional verification has been reported).
+    """
+    setup_logging()
+    print(f"Using API URL: {api_url}")
+    logger.info(f"Using API URL: {api_url}")
+    headless = answers is not None
+
+    # --- 1. ASK ABOUT RESELLER CONFIGS ---
+    if headless:
+        include_resellers = resolve_gatekeeper(answers, "include_resellers")
+    else:
+        include_resellers = ask_gatekeeper("Do you want to apply Reseller-specific configs?")
             
     if not include_resellers:
         print(">> Filtering engaged: Reseller configs will be skipped.")
@@ -167,87 +376,443 @@ def update_configurations(customer_name=None, config_file=os.path.join("config",
         print(">> Standard mode: All configs will be processed.")
 
     # --- 2. ASK ABOUT CSS COLOR CONFIGS ---
-    include_css_colors = False
-    
-    while True:
-        user_input = input("Do you want to set/change CSS color configurations? (yes/no): ").strip()
-        try:
-            validated_response = validate_yes_no(user_input, logger=logger)
-            include_css_colors = (validated_response == "yes")
-            break
-        except ValueError:
-            print("Invalid input. Please enter 'yes' or 'no'.")
+    if headless:
+        include_css_colors = resolve_gatekeeper(answers, "include_css_colors")
+    else:
+        include_css_colors = ask_gatekeeper("Do you want to set/change CSS color configurations?")
             
     if not include_css_colors:
         print(">> CSS color configs will be skipped.")
         logger.info("Skipping CSS color configurations per user request.")
+    elif headless:
+        print(">> CSS color configs will be processed from the answers file.")
+        logger.info("CSS color configurations will be taken from the answers file.")
     else:
         print(">> CSS color configs will be processed - you will be prompted for input.")
         logger.info("CSS color configurations will be prompted.")
 
     # --- 3. LOAD CONFIGS (DO THIS ONLY ONCE) ---
-    configs = load_json_config(config_file, customer_name, logger=logger)
+    items = load_items(config_file, customer_name)
+
+    # Headless runs fail here, before any write, if an answer is invalid
+    headless_values = resolve_headless_values(items, answers, include_css_colors) if headless else None
     
-    # --- 4. START SINGLE LOOP ---
-    for config in configs:
+    # --- 4. RENDER THE QUEUE (GATEKEEPERS + PROMPTS), THEN SEND THE COMPILED PLAN ---
+    rendered = render_items(items, include_resellers, include_css_colors, headless_values)
+    if options.optimize:
+        rendered = optimize_queue(rendered)
+    plan = compile_plan(rendered, description=WRITE_DESCRIPTION)
+    options = start_deadline(options)
+    failed = send_plan(plan, api_url, customer_name, options)
+
+    # --- 5. OPTIONAL POST-APPLY VERIFICATION (ONE LISTING CALL) ---
+    report = report_verification(plan, api_url, options) if verify else None
+    if failed:
+        raise PlanFailedError(f"{len(failed)} of {len(plan)} writes failed on {api_url}", failed)
+    return report
+
+def send_plan(plan, api_url, customer_name=None, options=DEFAULT_RUN_OPTIONS):
+    """Executes plan with its outcomes recorded in the transaction history. Returns the failed requests."""
+    recorder = open_recorder(api_url, customer_name, options)
+    try:
+        return execute_plan(plan, api_url, recorder, options)
+    finally:
+        if recorder is not None:
+            recorder.close()
+
+def prepare_plan(config_file, customer_name, answers, options=DEFAULT_RUN_OPTIONS):
+    """Headless load, render, optional optimization and compilation of one customer's plan (no writes)."""
+    rendered = render_headless(load_items(config_file, customer_name), answers)
+    if options.optimize:
+        rendered = optimize_queue(rendered)
+    return compile_plan(rendered, description=WRITE_DESCRIPTION)
+
+def load_items(config_file, customer_name=None):
+    """Reads the blueprint into ConfigItems with 'custID' replaced and scope codes resolved to API names."""
+    configs = load_json_config(config_file, customer_name, logger=logger)
+    resolve_scope = lambda scope: SCOPE_MAPPING[validate_scope(scope, SCOPE_MAPPING, logger=logger)]
+    return [ConfigItem.from_dict(config, resolve_scope=resolve_scope) for config in configs]
+
+def render_headless(items, answers):
+    """Gatekeepers and prompted values from answers only (no output, no prompts); raises ValueError like a headless run."""
+    include_resellers = resolve_gatekeeper(answers, "include_resellers")
+    include_css_colors = resolve_gatekeeper(answers, "include_css_colors")
+    headless_values = resolve_headless_values(items, answers, include_css_colors)
+    return render_items(items, include_resellers, include_css_colors, headless_values)
+
+def optimize_queue(rendered):
+    """Collapses full scope fan-outs to '*' and merges duplicate targets (--optimize), reporting the savings."""
+    from utils.plan_optimizer import optimize_items
+    optimized, report = optimize_items(rendered, SCOPE_MAPPING.values())
+    print(f">> Optimizer: {report.writes_before} -> {report.writes_after} writes "
+          f"({report.collapsed} from collapsed scope fan-outs, {report.merged} from duplicate targets)")
+    logger.info(f"Optimizer saved {report.saved} of {report.writes_before} writes (collapsed={report.collapsed}, merged={report.merged})")
+    return optimized
+
+def report_verification(plan, api_url, options=DEFAULT_RUN_OPTIONS):
+    from utils.verification import verify_plan
+    report = verify_plan(get_api_helper(api_url, options), plan, logger=logger)
+    print(f">> Verification: {report.matched}/{report.checked} written targets match on {api_url}")
+    for drift in report.drift:
+        found = f"'{drift.actual}'" if drift.actual is not None else "nothing"
+        print(f"   DRIFT: {drift.config_name} (Scope: {drift.scope}, Reseller: {drift.reseller}) expected '{drift.expected}', found {found}")
+    return report
+
+def render_items(items, include_resellers, include_css_colors, headless_values=None):
+    """
+    Applies the gatekeepers and fills in prompted values.
+
+    headless_values (dict, optional): Pre-validated values; when None the user is prompted.
+    Returns the ConfigItems to send, with their final values, in blueprint order.
+    """
+    rendered = []
+    for item in items:
         
         # [A] RESELLER GATEKEEPER CHECK
-        if "reseller" in config and not include_resellers:
+        if item.is_reseller and not include_resellers:
             continue
 
         # [B] CSS COLOR GATEKEEPER CHECK
-        config_name = config["config_name"]
+        config_name = item.config_name
         if config_name in UI_CONFIG_PROMPT_COLOR_HEX and not include_css_colors:
             # Skip CSS color configs if user said no
             logger.info(f"Skipping CSS color config: {config_name}")
             continue
 
         # [C] PROCESS THE CONFIG
-        current_value = config["config_value"]
+        current_value = item.config_value
         
         # Only prompt for inputs if it is NOT a reseller config
-        if "reseller" not in config:
-            if config_name in UI_CONFIG_PROMPT_COLOR_HEX:
-                config["config_value"] = prompt_for_color(config_name, current_value, UI_CONFIG_PROMPT_COLOR_HEX[config_name])
+        if not item.is_reseller:
+            if headless_values is not None:
+                if config_name in headless_values:
+                    item = item.with_value(headless_values[config_name])
+            elif config_name in UI_CONFIG_PROMPT_COLOR_HEX:
+                item = item.with_value(prompt_for_color(config_name, current_value, UI_CONFIG_PROMPT_COLOR_HEX[config_name]))
             elif config_name in YES_NO_CONFIGS:
-                config["config_value"] = prompt_for_yes_no(config_name, current_value)
+                item = item.with_value(prompt_for_yes_no(config_name, current_value))
             elif config_name in NUMERIC_CONFIGS:
-                config["config_value"] = prompt_for_numeric(config_name, current_value)
+                item = item.with_value(prompt_for_numeric(config_name, current_value))
             elif config_name in STRING_CONFIGS:
-                config["config_value"] = prompt_for_string(config_name, current_value)
+                item = item.with_value(prompt_for_string(config_name, current_value))
         
-        # [D] HANDLE SCOPES
-        scopes = config.get("scopes", []) if "scopes" in config else config.get("scope", [])
-        if isinstance(scopes, str):
-            scopes = [scope.strip() for scope in scopes.split(",")]
-        
-        validated_scopes = []
-        for scope in scopes:
-            validated_scope = validate_scope(scope, SCOPE_MAPPING, logger=logger)
-            full_scope_name = SCOPE_MAPPING.get(validated_scope, validated_scope)
-            validated_scopes.append(full_scope_name)
-        
-        # [E] SEND TO API
-        if validated_scopes:
-            for full_scope_name in validated_scopes:
-                send_configuration(config, api_url, full_scope_name)
-        else:
-            send_configuration(config, api_url)
+        rendered.append(item)
+    return rendered
+
+def preflight_domains(api_url, customer_names, page_size=None, options=DEFAULT_RUN_OPTIONS):
+    """Checks every customer domain with one listing pass; raises before any write if some are missing."""
+    from utils.validators import verify_domains_exist
+    existing, missing = verify_domains_exist(get_api_helper(api_url, options), customer_names, logger=logger, page_size=page_size)
+    print(f">> Domain check: {len(existing)}/{len(customer_names)} customer domains found on {api_url}")
+    if missing:
+        for domain in missing:
+            print(f"   MISSING: {domain}")
+        raise ValueError(f"{len(missing)} customer domain(s) not found on {api_url}; no configurations were written.")
+
+def split_shared_writes(plans):
+    """
+    Separates writes that are identical for every customer from customer-specific ones.
+
+    Writes are global ('domain': '*'), so an entry without 'custID' compiles to the same
+    request for every customer; sending it once per cluster is enough. Shared writes go out
+    before every customer-specific one, so a common write stays with the customers when any
+    plan also has a customer-specific write to the same (config, scope, reseller) target or
+    one it depends on; the blueprint's last-one-wins order and dependencies are kept.
+
+    Args:
+        plans (list): One compiled plan per customer, in customer order.
+
+    Returns:
+        tuple: (shared requests in first-plan order, list of per-customer remainders)
+    """
+    from utils.scheduling import prerequisites_for
+
+    shared = set(plans[0])
+    for plan in plans[1:]:
+        shared.intersection_update(plan)
+    # Keeping one write with the customers can pull in others that target or depend on it
+    changed = True
+    while changed:
+        changed = False
+        for plan in plans:
+            specific = [request.task for request in plan if request not in shared]
+            targets = {(task.config_name, task.scope, task.reseller) for task in specific}
+            names = {task.config_name for task in specific}
+            for request in plan:
+                task = request.task
+                if request in shared and ((task.config_name, task.scope, task.reseller) in targets
+                                          or prerequisites_for(task.config_name, task.depends_on) & names):
+                    shared.discard(request)
+                    changed = True
+    shared_plan = tuple(request for request in plans[0] if request in shared)
+    return shared_plan, [tuple(request for request in plan if request not in shared) for plan in plans]
+
+def run_customers_deduplicated(customer_names, config_file, api_url, answers, verify=False, options=DEFAULT_RUN_OPTIONS):
+    """Headless multi-customer run: shared writes go out once, then each customer's specific ones."""
+    # Every plan is rendered and validated before the first write
+    plans = [prepare_plan(config_file, customer_name, answers, options) for customer_name in customer_names]
+    shared_plan, specific_plans = split_shared_writes(plans)
+    options = start_deadline(options)
+
+    print(f"\n=== Shared writes (all {len(customer_names)} customers) ===")
+    logger.info(f"Sending {len(shared_plan)} customer-invariant writes once for {len(customer_names)} customers")
+    failed = send_plan(shared_plan, api_url, options=options)
+    reports = []
+    for customer_name, plan, specific_plan in zip(customer_names, plans, specific_plans):
+        print(f"\n=== Customer: {customer_name} ({len(specific_plan)} customer-specific writes) ===")
+        logger.info(f"Applying {len(specific_plan)} customer-specific writes for customer: {customer_name}")
+        failed.extend(send_plan(specific_plan, api_url, customer_name, options))
+        if verify:
+            reports.append(report_verification(plan, api_url, options))
+
+    undeduplicated = sum(len(plan) for plan in plans)
+    sent = len(shared_plan) + sum(len(plan) for plan in specific_plans)
+    print(f"\n>> Sent {sent} writes for {len(customer_names)} customers instead of {undeduplicated} "
+          f"({undeduplicated - sent} saved by sending {len(shared_plan)} shared writes once)")
+    logger.info(f"Cross-customer dedup on {api_url}: {sent}/{undeduplicated} writes sent, {undeduplicated - sent} saved")
+    if failed:
+        raise PlanFailedError(f"{len(failed)} of {sent} writes failed on {api_url}", failed)
+    return reports
+
+def run_customers(customer_names, config_file, api_url, answers, verify_domains=False, domain_page_size=None, verify=False,
+                  options=DEFAULT_RUN_OPTIONS):
+    """
+    Applies the blueprint once per customer, optionally verifying all their domains up front.
+
+    Headless runs for several customers send customer-invariant writes only once (unless
+    --no-dedup). Returns the VerificationReports (empty unless verify=True).
+    A customer whose writes partly failed does not stop the others; PlanFailedError is raised at the end.
+    """
+    if answers is not None:
+        # Nothing is prompted, so the deadline also covers the domain check and every customer
+        options = start_deadline(options)
+    if verify_domains:
+        preflight_domains(api_url, customer_names, page_size=domain_page_size, options=options)
+    if answers is not None and options.deduplicate and len(customer_names) > 1:
+        return run_customers_deduplicated(customer_names, config_file, api_url, answers, verify=verify, options=options)
+    reports = []
+    failed = []
+    for customer_name in customer_names:
+        print(f"\n=== Customer: {customer_name} ===")
+        logger.info(f"Applying blueprint for customer: {customer_name}")
+        try:
+            report = update_configurations(customer_name=customer_name, config_file=config_file, api_url=api_url, answers=answers, verify=verify,
+                                           options=options)
+        except PlanFailedError as e:
+            print(f"Error: {e}")
+            failed.extend(e.failed)
+            continue
+        if report is not None:
+            reports.append(report)
+    if failed:
+        raise PlanFailedError(f"{len(failed)} writes failed on {api_url} across {len(customer_names)} customers", failed)
+    return reports
+
+def run_shard(clusters, customer_names, config_file, answers, shard, output=None, verify_domains=False, domain_page_size=None,
+              options=DEFAULT_RUN_OPTIONS):
+    """
+    Runs this node's share of the cluster x customer matrix (--shard i/N) and journals it to output.
+
+    Units are (cluster, customer) pairs, plus one (cluster, '*') unit per cluster for the
+    customer-invariant writes when several customers are deduplicated. Every node computes the
+    same split. Customer units are spread over the shards; each shard runs the shared unit of
+    every cluster it has customers on before them, so dependent writes never wait on another
+    node. All plans are rendered and validated before the
+    first write; a unit that fails is journaled and the shard carries on with the next one.
+
+    Returns the number of units that failed.
+    """
+    from utils.sharding import SHARED_UNIT, work_units, shard_units, default_shard_output, ShardJournal
+
+    index, count = shard
+    dedup = options.deduplicate and len(customer_names) > 1
+    units = work_units(clusters, customer_names, shared=dedup)
+    mine = shard_units(units, index, count)
+    output = output or default_shard_output(index, count)
+    print(f">> Shard {index}/{count}: {len(mine)} of {len(units)} work units, journal: {output}")
+    logger.info(f"Shard {index}/{count}: {len(mine)}/{len(units)} units -> {output}")
+
+    # Plans are cluster-independent: render once, and split out the shared writes the same way on every node
+    plans = {customer_name: prepare_plan(config_file, customer_name, answers, options) for customer_name in customer_names}
+    if dedup:
+        shared_plan, specific_plans = split_shared_writes([plans[name] for name in customer_names])
+        unit_plans = dict(zip(customer_names, specific_plans))
+        unit_plans[SHARED_UNIT] = shared_plan
+    else:
+        unit_plans = plans
+
+    options = start_deadline(options)
+    if verify_domains:
+        for cluster in clusters:
+            names = [customer for unit_cluster, customer in mine if unit_cluster == cluster and customer != SHARED_UNIT]
+            if names:
+                preflight_domains(cluster, names, page_size=domain_page_size, options=options)
+
+    failed_units = 0
+    journal = ShardJournal(output, index, count, get_run_id(options))
+    options = replace(options, journal=journal)
+    try:
+        for cluster, customer_name in mine:
+            plan = unit_plans[customer_name]
+            label = "shared writes" if customer_name == SHARED_UNIT else customer_name
+            print(f"\n=== Shard {index}/{count}: {cluster} / {label} ({len(plan)} writes) ===")
+            try:
+                failed = send_plan(plan, cluster, None if customer_name == SHARED_UNIT else customer_name, options)
+                journal.unit_done(cluster, customer_name, len(plan), len(failed))
+                failed_units += 1 if failed else 0
+            except Exception as e:
+                print(f"Error: {e}")
+                logger.error(f"Shard {index}/{count}: unit {cluster} / {label} failed: {e}")
+                journal.unit_done(cluster, customer_name, len(plan), None, error=str(e))
+                failed_units += 1
+    finally:
+        journal.close()
+    print(f"\n>> Shard {index}/{count} finished: {len(mine) - failed_units}/{len(mine)} units clean; merge {output} with shards.py merge")
+    return failed_units
+
+def build_arg_parser():
+    import argparse  # CLI-only; importing ui_configs as a library should not pay for it
+    parser = argparse.ArgumentParser(description="Apply the UI configuration blueprint to a NetSapiens cluster.")
+    parser.add_argument("config_file", nargs="?", default=os.path.join("config", "ui_configs.json"),
+                        help="Blueprint JSON file (default: config/ui_configs.json)")
+    parser.add_argument("--headless", action="store_true",
+                        help="Never prompt; take every answer from flags and the answers file")
+    parser.add_argument("--answers", help="JSON answers file with gatekeeper choices and per-config values (implies --headless)")
+    parser.add_argument("--api-url", help="Full API URL (e.g., https://api.example.ucaas.tech)")
+    parser.add_argument("--customer", help="Customer name used for 'custID' replacement")
+    parser.add_argument("--customers", help="Comma-separated customer names; applies the blueprint to each (headless only)")
+    parser.add_argument("--clusters", help="Comma-separated API URLs for a sharded rollout (headless only, with --shard)")
+    parser.add_argument("--shard", metavar="i/N",
+                        help="Run only shard i of N of the cluster x customer matrix (stable split; combine with shards.py merge)")
+    parser.add_argument("--shard-output", help="Shard journal file (default: data/shard-<i>-of-<N>.jsonl)")
+    parser.add_argument("--run-id", help="Run id stamped on every recorded write (give all shards of a rollout the same one)")
+    parser.add_argument("--verify-domains", action="store_true",
+                        help="Check that every customer domain exists (one listing call) before any write")
+    parser.add_argument("--domain-page-size", type=int,
+                        help="Read the domain list in concurrent pages of this size instead of one call")
+    parser.add_argument("--include-resellers", choices=["yes", "no"], help="Apply reseller-specific configs")
+    parser.add_argument("--include-css", choices=["yes", "no"], help="Apply CSS color configs")
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=VALUE",
+                        help="Value for a prompted config (repeatable, overrides the answers file)")
+    parser.add_argument("--verify", action="store_true",
+                        help="After the push, re-read the cluster's configurations once and report drift (exit code 2 on drift)")
+    parser.add_argument("--optimize", action="store_true",
+                        help="Send an entry covering every scope once as scope '*', and drop writes overwritten later in the blueprint")
+    parser.add_argument("--no-dedup", action="store_true",
+                        help="With several customers, re-send customer-invariant writes for every customer")
+    parser.add_argument("--parallel", type=int, default=1, metavar="N",
+                        help="Send up to N writes at once, ordered by config dependencies (default: 1, file order)")
+    parser.add_argument("--no-history", action="store_true",
+                        help="Do not record write outcomes in the transaction history (HISTORY_DB_PATH, default data/history.db)")
+    parser.add_argument("--deadline", type=float, metavar="SECONDS",
+                        help="Overall time budget for the run; request timeouts are capped by what is left")
+    parser.add_argument("--slow-request-seconds", type=float,
+                        help="Log a warning for API requests slower than this (overrides API_SLOW_REQUEST_SECONDS)")
+    parser.add_argument("--profile-sample-rate", type=float,
+                        help="Profile this fraction of API requests with cProfile and keep the slow ones (overrides API_PROFILE_SAMPLE_RATE)")
+    parser.add_argument("--profile-slow-seconds", type=float, default=1.0,
+                        help="Keep captured profiles only for requests at least this slow (default: 1.0)")
+    return parser
+
+def build_api_hooks(args):
+    """Turns the profiling flags into a tuple of hooks; returns None to fall back to the environment."""
+    if args.slow_request_seconds is None and args.profile_sample_rate is None:
+        return None
+    from utils.api_hooks import SlowRequestLogHook, SamplingProfilerHook
+    hooks = []
+    if args.slow_request_seconds is not None:
+        hooks.append(SlowRequestLogHook(logger, threshold_seconds=args.slow_request_seconds))
+    if args.profile_sample_rate is not None:
+        hooks.append(SamplingProfilerHook(logger, sample_rate=args.profile_sample_rate, slow_threshold_seconds=args.profile_slow_seconds))
+    return tuple(hooks)
+
+def build_run_options(args):
+    return RunOptions(hooks=build_api_hooks(args), deadline_seconds=args.deadline or None, run_id=args.run_id, history=not args.no_history,
+                      max_parallel=max(1, args.parallel), optimize=args.optimize, deduplicate=not args.no_dedup)
+
+def build_answers(args):
+    """Merges the answers file with command-line overrides. Returns None for interactive runs."""
+    if not (args.headless or args.answers):
+        return None
+    answers = load_answers(args.answers) if args.answers else {}
+    answers.setdefault("values", {})
+    if args.include_resellers:
+        answers["include_resellers"] = args.include_resellers
+    if args.include_css:
+        answers["include_css_colors"] = args.include_css
+    if args.api_url:
+        answers["api_url"] = args.api_url
+    if args.customer:
+        answers["customer_name"] = args.customer
+    if args.customers:
+        answers["customers"] = [name.strip() for name in args.customers.split(",") if name.strip()]
+    if args.clusters:
+        answers["clusters"] = [url.strip() for url in args.clusters.split(",") if url.strip()]
+    for assignment in args.set:
+        if "=" not in assignment:
+            raise ValueError(f"--set expects NAME=VALUE, got '{assignment}'.")
+        name, value = assignment.split("=", 1)
+        answers["values"][name.strip()] = value
+    return answers
 
 if __name__ == "__main__":
     import sys
+    args = build_arg_parser().parse_args()
+    setup_logging()
+    options = build_run_options(args)
     print("Starting UI configurations update script (standalone mode)")
     logger.info("Starting UI configurations update script (standalone mode)")
     
     try:
-        api_url = validate_url(input("Enter the full API URL (e.g., https://api.example.ucaas.tech): ").strip(), logger=logger)
-        customer_name = input("Enter the customer name (e.g., sgdemo, or press Enter to skip): ").strip() or None
-        logger.info(f"Customer name entered: {customer_name if customer_name else 'None'}")
-        config_file = sys.argv[1] if len(sys.argv) > 1 else os.path.join("config", "ui_configs.json")
-        update_configurations(customer_name=customer_name, config_file=config_file, api_url=api_url)
+        answers = build_answers(args)
+
+        if args.shard:
+            from utils.sharding import parse_shard
+            shard = parse_shard(args.shard)
+            if answers is None:
+                raise ValueError("--shard requires --headless or --answers.")
+            if not options.run_id:
+                raise ValueError("--shard requires --run-id, the same on every shard, so shards.py merge can combine them.")
+            urls = answers.get("clusters") or ([answers["api_url"]] if answers.get("api_url") else [])
+            if not urls:
+                raise ValueError("--shard needs --clusters, --api-url or 'clusters'/'api_url' in the answers file.")
+            clusters = [validate_url(url.strip(), logger=logger) for url in urls]
+            customer_names = answers.get("customers") or [answers.get("customer_name") or None]
+            if args.verify_domains and None in customer_names:
+                raise ValueError("--verify-domains needs a customer name for every run.")
+            failed_units = run_shard(clusters, customer_names, args.config_file, answers, shard, output=args.shard_output,
+                                     verify_domains=args.verify_domains, domain_page_size=args.domain_page_size, options=options)
+            sys.exit(1 if failed_units else 0)
+
+        if answers is not None:
+            if not answers.get("api_url"):
+                raise ValueError("Headless mode requires --api-url or 'api_url' in the answers file.")
+            api_url = validate_url(answers["api_url"].strip(), logger=logger)
+            customer_names = answers.get("customers") or [answers.get("customer_name") or None]
+        else:
+            if args.customers:
+                raise ValueError("--customers requires --headless or --answers.")
+            api_url = validate_url((args.api_url or input("Enter the full API URL (e.g., https://api.example.ucaas.tech): ")).strip(), logger=logger)
+            customer_names = [args.customer or input("Enter the customer name (e.g., sgdemo, or press Enter to skip): ").strip() or None]
+        logger.info(f"Customer name(s) entered: {', '.join(name for name in customer_names if name) or 'None'}")
+
+        if args.verify_domains and None in customer_names:
+            raise ValueError("--verify-domains needs a customer name for every run.")
+        if len(customer_names) == 1 and not args.verify_domains:
+            report = update_configurations(customer_name=customer_names[0], config_file=args.config_file, api_url=api_url, answers=answers, verify=args.verify,
+                                           options=options)
+            reports = [report] if report is not None else []
+        else:
+            reports = run_customers(customer_names, args.config_file, api_url, answers,
+                                    verify_domains=args.verify_domains, domain_page_size=args.domain_page_size, verify=args.verify,
+                                    options=options)
         print("UI configurations update script completed")
         logger.info("UI configurations update script completed")
+        if options.history and options.run_id:
+            print(f">> Write outcomes recorded in the transaction history as run {options.run_id}")
+        if any(not report.ok for report in reports):
+            sys.exit(2)
     except Exception as e:
         print(f"Error: {e}")
         logger.error(f"Script failed: {e}")
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
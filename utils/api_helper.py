@@ -1,5 +1,9 @@
 import requests
 import json
+import time
+from utils.api_hooks import RequestContext, hooks_from_env
+from utils.circuit_breaker import get_breaker
+from utils.timeouts import get_latency_tracker, cap_timeouts, DeadlineExceeded, DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT
 # We can keep your existing logging setup if you copy the 'utils' folder
 # If not, you can replace this with standard 'import logging'
 try:
@@ -11,7 +15,7 @@ except ImportError:
         return logging.getLogger("APIHelper")
 
 class APIHelper:
-    def __init__(self, api_url, access_token, logger=None):
+    def __init__(self, api_url, access_token, logger=None, hooks=None, cache=None, breaker=None, deadline=None, max_retries=1):
         """
         Initializes the API helper with a dynamic URL and OAuth token from the user session.
         
@@ -19,6 +23,16 @@ class APIHelper:
             api_url (str): The customer's API domain (e.g., 'api.customer.com').
             access_token (str): The Bearer token obtained during login.
             logger (logging.Logger, optional): Custom logger. Defaults to setup_logging().
+            hooks (list, optional): RequestHook instances run around every request.
+                Defaults to the built-in hooks enabled through environment variables (see api_hooks.hooks_from_env).
+            cache (ResponseCache, optional): Read cache for GET requests (see utils.http_cache). Disabled if None.
+            breaker (CircuitBreaker, optional): Defaults to the shared per-host breaker (see utils.circuit_breaker).
+            deadline (RunDeadline, optional): Overall budget; every request's timeout is capped by what is left.
+            max_retries (int, optional): Retries for requests cut by an adaptive timeout. Defaults to 1.
+
+        Writes made without an explicit timeout use adaptive (connect, read) timeouts from the
+        cluster's observed write latency (see utils.timeouts); passing timeout= keeps it fixed.
+        Reads (GET) without one use the fixed defaults: a bulk listing is not comparable to a write.
         """
         # 1. Sanitize the URL (Ensure https:// exists and no trailing slash)
         api_url = api_url.strip()
@@ -29,7 +43,15 @@ class APIHelper:
 
         # 2. Setup Logging
         self.logger = logger if logger else setup_logging()
-        
+
+        # Request/response hook chain shared by every verb
+        self.hooks = list(hooks) if hooks is not None else hooks_from_env(self.logger)
+        self.cache = cache
+        self.breaker = breaker if breaker is not None else get_breaker(self.api_url)
+        self.latency = get_latency_tracker(self.api_url)
+        self.deadline = deadline
+        self.max_retries = max_retries
+
         # 3. Set Headers with the Dynamic Token
         if not access_token:
             raise ValueError("APIHelper initialized without a valid access_token!")
@@ -45,81 +67,123 @@ class APIHelper:
         self.logger.info(f"APIHelper initialized for target: {self.api_url}")
         self.logger.debug(f"Using Token: {token_preview}")
 
-    def post(self, endpoint, data, files=None, timeout=30):
+    def add_hook(self, hook):
+        """Appends a RequestHook (see utils.api_hooks) to this helper's chain."""
+        self.hooks.append(hook)
+        return hook
+
+    def _run_hooks(self, callback, *args):
+        for hook in (self.hooks if callback == "before_request" else reversed(self.hooks)):
+            try:
+                getattr(hook, callback)(*args)
+            except Exception as e:
+                # A broken hook must never fail the push itself
+                self.logger.error(f"{type(hook).__name__}.{callback} failed: {e}")
+
+    def _request(self, method, endpoint, data=None, files=None, timeout=None, extra_headers=None, raw_body=None):
+        """Shared request path for every verb; runs the hook chain around the HTTP call."""
         url = f"{self.api_url}/{endpoint}"
-        self.logger.info(f"Making POST request to {url}")
-        
-        # Only log payload if it's not a file upload (too noisy/binary)
-        if not files:
-            self.logger.debug(f"Request payload: {json.dumps(data, indent=2)}")
-            
-        try:
+        self.logger.info(f"Making {method} request to {url}")
+
+        body = None
+        if raw_body is not None:
+            # Pre-serialized JSON (see utils.request_plan); %s keeps the decode off the hot path unless DEBUG is on
+            self.logger.debug("Request payload: %s", raw_body)
+            body = raw_body
+        elif method in ("POST", "PUT"):
+            # Only log payload if it's not a file upload (too noisy/binary)
+            if not files:
+                self.logger.debug(f"Request payload: {json.dumps(data, indent=2)}")
             # Use data=json.dumps(data) for JSON, or data=data for files/form-data
-            response = requests.post(
-                url, 
-                headers=self.headers, 
-                data=json.dumps(data) if not files else data, 
-                files=files, 
-                timeout=timeout
-            )
-            self.logger.info(f"Received response with status code: {response.status_code}")
-            
-            # Log error text if request failed, otherwise debug
-            if not response.ok:
-                self.logger.error(f"Failed Response: {response.text}")
-            else:
-                self.logger.debug(f"Response text: {response.text}")
-                
-            return response
-        except requests.exceptions.RequestException as e:
-            self.logger.error(f"Error calling {url}: {e}")
-            raise
+            body = json.dumps(data) if not files else data
 
-    def put(self, endpoint, data, files=None, timeout=30):
-        url = f"{self.api_url}/{endpoint}"
-        self.logger.info(f"Making PUT request to {url}")
-        if not files:
-            self.logger.debug(f"Request payload: {json.dumps(data, indent=2)}")
-        try:
-            response = requests.put(
-                url, 
-                headers=self.headers, 
-                data=json.dumps(data) if not files else data, 
-                files=files, 
-                timeout=timeout
-            )
-            self.logger.info(f"Received response with status code: {response.status_code}")
-            
-            if not response.ok:
-                self.logger.error(f"Failed Response: {response.text}")
-            else:
-                self.logger.debug(f"Response text: {response.text}")
-                
-            return response
-        except requests.exceptions.RequestException as e:
-            self.logger.error(f"Error calling {url}: {e}")
-            raise
+        headers = {**self.headers, **extra_headers} if extra_headers else self.headers
 
-    def get(self, endpoint, timeout=30):
-        url = f"{self.api_url}/{endpoint}"
-        self.logger.info(f"Making GET request to {url}")
-        try:
-            response = requests.get(url, headers=self.headers, timeout=timeout)
-            self.logger.info(f"Received response with status code: {response.status_code}")
+        # timeout=None on a write means "adaptive": derived from this cluster's observed write latency,
+        # and an early-cut slow outlier is retried (within the run deadline) instead of stalling the push
+        adaptive = timeout is None and not files and method != "GET"
+        if timeout is None and not adaptive:
+            timeout = (DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT)
+        attempts = 1 + (self.max_retries if adaptive else 0)
+        for attempt in range(1, attempts + 1):
+            request_timeout = cap_timeouts(timeout if not adaptive else self.latency.timeouts(), self.deadline)
+            try:
+                response, ctx = self._send_once(method, url, headers, body, files, request_timeout, data, final_attempt=(attempt == attempts))
+                break
+            except requests.exceptions.Timeout as e:
+                if attempt == attempts or isinstance(e, DeadlineExceeded):
+                    raise
+                self.logger.warning(f"{method} {url} exceeded adaptive timeout ({request_timeout[0]:.1f}s connect / {request_timeout[1]:.1f}s read); retrying ({attempt}/{attempts - 1})")
+
+        self.logger.info(f"Received response with status code: {response.status_code}")
+
+        # Log error text if request failed, otherwise debug
+        if not response.ok:
+            self.logger.error(f"Failed Response: {response.text}")
+        else:
             self.logger.debug(f"Response text: {response.text}")
-            return response
-        except requests.exceptions.RequestException as e:
-            self.logger.error(f"Error calling {url}: {e}")
-            raise
 
-    def delete(self, endpoint, timeout=30):
-        url = f"{self.api_url}/{endpoint}"
-        self.logger.info(f"Making DELETE request to {url}")
+        self._run_hooks("after_response", ctx, response)
+
+        # Any successful write makes cached reads of that resource stale
+        if self.cache is not None and method != "GET" and response.ok:
+            self.cache.invalidate(endpoint.split("?", 1)[0])
+        return response
+
+    def _send_once(self, method, url, headers, body, files, timeout, data, final_attempt=True):
+        """One HTTP attempt wrapped in the circuit breaker and hook chain. Returns (response, ctx)."""
+        # Fail fast (CircuitOpenError) instead of waiting out the timeout on a cluster that is down
+        self.breaker.before_request()
+
+        ctx = RequestContext(method, url, data)
+        self._run_hooks("before_request", ctx)
         try:
-            response = requests.delete(url, headers=self.headers, timeout=timeout)
-            self.logger.info(f"Received response with status code: {response.status_code}")
-            self.logger.debug(f"Response text: {response.text}")
-            return response
+            response = requests.request(method, url, headers=headers, data=body, files=files, timeout=timeout)
         except requests.exceptions.RequestException as e:
+            ctx.elapsed = time.perf_counter() - ctx.started_at
+            # A slow outlier cut early and about to be retried is not evidence the cluster is down
+            if isinstance(e, requests.exceptions.ConnectionError) or (isinstance(e, requests.exceptions.Timeout) and final_attempt):
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_other()
             self.logger.error(f"Error calling {url}: {e}")
-            raise
\ No newline at end of file
+            self._run_hooks("on_error", ctx, e)
+            raise
+
+        self.breaker.record_success()
+        ctx.elapsed = time.perf_counter() - ctx.started_at
+        if method != "GET":
+            self.latency.record(ctx.elapsed)
+        return response, ctx
+
+    def send_raw(self, method, endpoint, body, timeout=None):
+        """Sends an already-serialized JSON body (bytes) without re-encoding it."""
+        return self._request(method, endpoint, timeout=timeout, raw_body=body)
+
+    def post(self, endpoint, data, files=None, timeout=None):
+        return self._request("POST", endpoint, data=data, files=files, timeout=timeout)
+
+    def put(self, endpoint, data, files=None, timeout=None):
+        return self._request("PUT", endpoint, data=data, files=files, timeout=timeout)
+
+    def get(self, endpoint, timeout=None, use_cache=True):
+        if self.cache is None or not use_cache:
+            return self._request("GET", endpoint, timeout=timeout)
+
+        entry = self.cache.lookup(endpoint)
+        if entry is not None and entry.is_fresh:
+            self.logger.debug(f"Cache hit for GET {self.api_url}/{endpoint}")
+            return entry.response
+
+        # Stale entry with an ETag: ask the server whether it changed
+        extra_headers = {"If-None-Match": entry.etag} if entry is not None else None
+        response = self._request("GET", endpoint, timeout=timeout, extra_headers=extra_headers)
+        if response.status_code == 304 and entry is not None:
+            self.logger.debug(f"Revalidated cached GET {self.api_url}/{endpoint} (304)")
+            self.cache.renew(endpoint)
+            return entry.response
+        self.cache.store(endpoint, response)
+        return response
+
+    def delete(self, endpoint, timeout=None):
+        return self._request("DELETE", endpoint, timeout=timeout)
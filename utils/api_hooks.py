@@ -0,0 +1,132 @@
+import os
+import random
+import re
+import threading
+import time
+
+class RequestContext:
+    """Per-request state handed to every hook. Hooks may stash their own data in .extra."""
+    __slots__ = ("method", "url", "payload", "started_at", "elapsed", "extra")
+
+    def __init__(self, method, url, payload=None):
+        self.method = method
+        self.url = url
+        self.payload = payload
+        self.started_at = time.perf_counter()
+        self.elapsed = None
+        self.extra = {}
+
+class RequestHook:
+    """
+    Base class for APIHelper hooks. Override any subset of the three callbacks.
+
+    before_request runs in registration order; after_response / on_error run in reverse,
+    so a hook that wraps a request (e.g. a profiler) sees everything registered after it.
+    """
+
+    def before_request(self, ctx):
+        pass
+
+    def after_response(self, ctx, response):
+        pass
+
+    def on_error(self, ctx, error):
+        pass
+
+class SlowRequestLogHook(RequestHook):
+    """Logs a warning for every request slower than threshold_seconds (failed requests included)."""
+
+    def __init__(self, logger, threshold_seconds=2.0):
+        self.logger = logger
+        self.threshold_seconds = threshold_seconds
+
+    def after_response(self, ctx, response):
+        if ctx.elapsed >= self.threshold_seconds:
+            self.logger.warning(f"Slow request: {ctx.method} {ctx.url} took {ctx.elapsed:.2f}s (status {response.status_code}, threshold {self.threshold_seconds:.2f}s)")
+
+    def on_error(self, ctx, error):
+        if ctx.elapsed >= self.threshold_seconds:
+            self.logger.warning(f"Slow failed request: {ctx.method} {ctx.url} took {ctx.elapsed:.2f}s before error: {error}")
+
+class SamplingProfilerHook(RequestHook):
+    """
+    Runs cProfile around a random sample of requests and keeps the profile only if the request was slow.
+
+    Kept profiles are written as <output_dir>/<timestamp>_<method>_<endpoint>.prof (open with
+    pstats or snakeviz) and the top entries are logged at DEBUG level.
+
+    Args:
+        logger (logging.Logger): Where to report captured profiles.
+        sample_rate (float): Fraction of requests to profile (0.0 - 1.0).
+        slow_threshold_seconds (float): Only profiles of requests at least this slow are kept.
+        output_dir (str): Directory for .prof files.
+    """
+
+    def __init__(self, logger, sample_rate=0.05, slow_threshold_seconds=1.0, output_dir=os.path.join("logs", "profiles")):
+        self.logger = logger
+        self.sample_rate = sample_rate
+        self.slow_threshold_seconds = slow_threshold_seconds
+        self.output_dir = output_dir
+        # cProfile allows one active profiler per thread; requests on other threads are simply not sampled
+        self._active = threading.local()
+
+    def before_request(self, ctx):
+        if getattr(self._active, "busy", False) or random.random() >= self.sample_rate:
+            return
+        import cProfile
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            return  # Another profiler is already running on this thread
+        self._active.busy = True
+        ctx.extra["profiler"] = profiler
+
+    def after_response(self, ctx, response):
+        self._finish(ctx)
+
+    def on_error(self, ctx, error):
+        self._finish(ctx)
+
+    def _finish(self, ctx):
+        profiler = ctx.extra.pop("profiler", None)
+        if profiler is None:
+            return
+        profiler.disable()
+        self._active.busy = False
+        if ctx.elapsed < self.slow_threshold_seconds:
+            return
+
+        import io
+        import pstats
+        os.makedirs(self.output_dir, exist_ok=True)
+        endpoint = re.sub(r"[^A-Za-z0-9]+", "_", ctx.url.split("://", 1)[-1]).strip("_")[-80:]
+        path = os.path.join(self.output_dir, f"{time.strftime('%Y%m%d-%H%M%S')}_{ctx.method}_{endpoint}.prof")
+        profiler.dump_stats(path)
+
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(15)
+        self.logger.info(f"Captured profile for slow {ctx.method} {ctx.url} ({ctx.elapsed:.2f}s): {path}")
+        self.logger.debug(f"Profile summary:\n{summary.getvalue()}")
+
+def hooks_from_env(logger, env=None):
+    """
+    Builds the built-in hooks from environment variables so production runs can enable them without code changes.
+
+        API_SLOW_REQUEST_SECONDS  enables SlowRequestLogHook with this threshold
+        API_PROFILE_SAMPLE_RATE   enables SamplingProfilerHook with this sample rate
+        API_PROFILE_SLOW_SECONDS  profile keep threshold (default 1.0)
+        API_PROFILE_DIR           profile output directory (default logs/profiles)
+    """
+    env = os.environ if env is None else env
+    hooks = []
+    if env.get("API_SLOW_REQUEST_SECONDS"):
+        hooks.append(SlowRequestLogHook(logger, threshold_seconds=float(env["API_SLOW_REQUEST_SECONDS"])))
+    if env.get("API_PROFILE_SAMPLE_RATE"):
+        hooks.append(SamplingProfilerHook(
+            logger,
+            sample_rate=float(env["API_PROFILE_SAMPLE_RATE"]),
+            slow_threshold_seconds=float(env.get("API_PROFILE_SLOW_SECONDS", 1.0)),
+            output_dir=env.get("API_PROFILE_DIR", os.path.join("logs", "profiles"))
+        ))
+    return hooks
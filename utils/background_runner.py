@@ -0,0 +1,83 @@
+import queue
+import threading
+
+class BackgroundRun:
+    """
+    Applies a queue of items on a daemon thread, independent of any UI render loop.
+
+    The worker never touches UI state. It publishes log entries and progress on a
+    thread-safe queue.Queue, and the UI drains that channel with poll() whenever it
+    redraws, so rendering never blocks or paces the API work.
+
+    Args:
+        items (list): Work items, applied in order.
+        apply_fn (callable): apply_fn(item) -> list of log entry dicts. Exceptions are
+            caught and end the run with .error set.
+        on_start (callable, optional): Called on the worker thread before the first item
+            (e.g. a one-off read the items rely on); an exception ends the run like apply_fn's.
+        on_done (callable, optional): Called on the worker thread once the run ends, however it ends.
+    """
+
+    def __init__(self, items, apply_fn, on_done=None, on_start=None):
+        self.total = len(items)
+        self.done = 0
+        self.finished = False
+        self.cancelled = False
+        self.error = None
+        self._items = list(items)
+        self._apply_fn = apply_fn
+        self._on_done = on_done
+        self._on_start = on_start
+        self._events = queue.Queue()
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="blueprint-apply", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        """Stops the run after the item currently in flight."""
+        self._cancel.set()
+
+    @property
+    def is_running(self):
+        return self._thread.is_alive()
+
+    def _run(self):
+        error = None
+        try:
+            if self._on_start is not None:
+                self._on_start()
+            for index, item in enumerate(self._items):
+                if self._cancel.is_set():
+                    break
+                self._events.put(("log", self._apply_fn(item)))
+                self._events.put(("progress", index + 1))
+        except Exception as e:
+            error = str(e)
+        finally:
+            if self._on_done is not None:
+                try:
+                    self._on_done()
+                except Exception as e:
+                    error = error or str(e)
+            self._events.put(("done", error))
+
+    def poll(self):
+        """Drains pending events (call from the UI thread). Returns the new log entries in order."""
+        new_entries = []
+        while True:
+            try:
+                kind, payload = self._events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "log":
+                new_entries.extend(payload)
+            elif kind == "progress":
+                self.done = payload
+            elif kind == "done":
+                self.finished = True
+                self.error = payload
+                self.cancelled = self._cancel.is_set() and self.done < self.total
+        return new_entries
@@ -0,0 +1,124 @@
+import json
+import os
+import threading
+
+DEFAULT_WATCH_STATE = os.getenv("WATCH_STATE_PATH", os.path.join("data", "watch_state.json"))
+
+def task_target(task):
+    """(config-name, user-scope, reseller) a WriteTask writes to."""
+    return (task.config_name, task.scope, task.reseller)
+
+def snapshot_key(blueprint, cluster, customer):
+    """Identity of one applied snapshot: the same blueprint can be applied to many clusters/customers."""
+    return f"{os.path.abspath(blueprint)}|{cluster}|{customer or ''}"
+
+def last_writes(plan):
+    """The plan with only the last write to each target, in plan order; earlier ones would be overwritten anyway."""
+    plan = list(plan)
+    last = {task_target(request.task): index for index, request in enumerate(plan)}
+    return [request for index, request in enumerate(plan) if last[task_target(request.task)] == index]
+
+def diff_plan(applied, plan):
+    """
+    Compares a compiled plan against the last applied snapshot of the same target.
+
+    The plan is first collapsed to its last write per target, so a blueprint that writes a
+    target twice is compared (and snapshotted) by the value that ends up stored.
+
+    Args:
+        applied (dict): target -> value last applied successfully (empty for a first run).
+        plan (iterable): PlannedRequests compiled from the current blueprint.
+
+    Returns:
+        tuple: (PlannedRequests that are new or changed, in plan order;
+                targets that were applied before but are no longer in the blueprint).
+    """
+    delta = []
+    current = set()
+    for request in last_writes(plan):
+        target = task_target(request.task)
+        current.add(target)
+        if applied.get(target) != request.task.config_value:
+            delta.append(request)
+    removed = [target for target in applied if target not in current]
+    return delta, removed
+
+class AppliedRecorder:
+    """
+    Write-outcome recorder that updates an applied snapshot as each write succeeds.
+
+    Takes the same record() calls as a TransactionRecorder (and forwards them to one, if given),
+    so successes are kept even when the run stops part-way through.
+    """
+
+    def __init__(self, applied, recorder=None):
+        self.applied = applied
+        self.recorder = recorder
+        self._lock = threading.Lock()
+
+    def record(self, request, result=None, error=None):
+        if result is not None and 200 <= result.response.status_code < 300:
+            with self._lock:
+                self.applied[task_target(request.task)] = request.task.config_value
+        if self.recorder is not None:
+            self.recorder.record(request, result, error)
+
+    def close(self):
+        if self.recorder is not None:
+            self.recorder.close()
+
+class AppliedSnapshots:
+    """
+    What was last applied successfully for each (blueprint, cluster, customer), kept in a JSON file.
+
+    Survives restarts, so a watcher that is stopped and started again only pushes what
+    changed in between. The file is replaced atomically on every save.
+    """
+
+    def __init__(self, path=DEFAULT_WATCH_STATE):
+        self.path = path
+        self._snapshots = {}
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                raw = json.load(f)
+            self._snapshots = {key: {tuple(row[:3]): row[3] for row in rows} for key, rows in raw.items()}
+
+    def get(self, key):
+        return dict(self._snapshots.get(key, {}))
+
+    def put(self, key, applied):
+        self._snapshots[key] = dict(applied)
+        self.save()
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        raw = {key: [[*target, value] for target, value in applied.items()] for key, applied in self._snapshots.items()}
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(raw, f, indent=1)
+        os.replace(temp_path, self.path)
+
+class FileWatcher:
+    """Reports which of a set of files changed (by mtime) since they were last acknowledged; at first, all of them."""
+
+    def __init__(self, paths):
+        self.paths = list(paths)
+        self._mtimes = {}
+
+    def poll(self):
+        """Returns {path: mtime} for every changed file."""
+        changed = {}
+        for path in self.paths:
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError:
+                continue  # Missing for a moment while an editor saves; picked up on a later poll
+            if self._mtimes.get(path) != mtime:
+                changed[path] = mtime
+        return changed
+
+    def acknowledge(self, path, mtime):
+        """Marks the version seen at mtime as handled. Left unacknowledged (e.g. invalid JSON mid-save), it is reported again."""
+        self._mtimes[path] = mtime
@@ -0,0 +1,88 @@
+import os
+import threading
+import time
+
+import requests
+
+from utils.clusters import cluster_host
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+DEFAULT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "3"))
+DEFAULT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised instead of sending a request while a cluster's circuit is open."""
+
+class CircuitBreaker:
+    """
+    Fails fast on a cluster that stopped answering.
+
+    Consecutive connection errors / timeouts open the circuit; while open every request is
+    rejected immediately with CircuitOpenError instead of waiting out its timeout. After
+    reset_seconds the circuit half-opens and lets up to half_open_probes requests through:
+    any HTTP response closes it again, another connection failure re-opens it.
+
+    HTTP error statuses (4xx/5xx) are answers from a live server and never trip the breaker.
+    """
+
+    def __init__(self, name, failure_threshold=DEFAULT_FAILURE_THRESHOLD, reset_seconds=DEFAULT_RESET_SECONDS, half_open_probes=1):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.half_open_probes = half_open_probes
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._probes_in_flight = 0
+        self._lock = threading.Lock()
+
+    def before_request(self):
+        """Reserves a slot for one request or raises CircuitOpenError."""
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self.opened_at < self.reset_seconds:
+                    raise CircuitOpenError(self._open_message())
+                self.state = HALF_OPEN
+                self._probes_in_flight = 0
+            if self.state == HALF_OPEN:
+                if self._probes_in_flight >= self.half_open_probes:
+                    raise CircuitOpenError(self._open_message())
+                self._probes_in_flight += 1
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self._probes_in_flight = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                self._probes_in_flight = 0
+
+    def record_other(self):
+        """Releases a half-open probe slot for a request that neither proved nor disproved health."""
+        with self._lock:
+            if self.state == HALF_OPEN and self._probes_in_flight:
+                self._probes_in_flight -= 1
+
+    def _open_message(self):
+        retry_in = max(0.0, self.reset_seconds - (time.monotonic() - self.opened_at))
+        return f"Circuit open for {self.name} after {self.failures} consecutive connection failures; retry in {retry_in:.0f}s"
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+def get_breaker(api_url, **kwargs):
+    """Returns the process-wide breaker for a cluster host (shared by every APIHelper and session)."""
+    host = cluster_host(api_url)
+    with _breakers_lock:
+        if host not in _breakers:
+            _breakers[host] = CircuitBreaker(host, **kwargs)
+        return _breakers[host]
@@ -0,0 +1,169 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from utils.clusters import LISTING_TIMEOUT, cluster_host
+from utils.request_plan import CONFIGURATIONS_ENDPOINT
+from utils.verification import index_configurations
+
+DEFAULT_CONFIG_TTL = float(os.getenv("CLUSTER_STATE_CONFIG_TTL", "60"))
+# After a failed configuration listing, wait this long before any session tries again
+LOAD_RETRY_SECONDS = 30
+# Cached tokens are dropped this long before the cluster says they expire
+TOKEN_EXPIRY_MARGIN = 60
+
+def target_key(config_name, scope, reseller):
+    """(config-name, user-scope, reseller) identity of one stored configuration."""
+    return (config_name, scope or "*", reseller or "*")
+
+class ClusterState:
+    """
+    What this process currently knows about one cluster, shared by every session and thread using the same credential.
+
+    Holds the known configuration values (and therefore which configs exist) with a TTL,
+    LRU-bounded. The listing load is single-flight: when several sessions need it at once,
+    one of them fetches it and the others wait for and reuse the result. Writes made
+    through any session update or drop the affected entry. Other reads, such as the
+    domain list, are cached by the APIHelper's ResponseCache (see utils.http_cache).
+
+    Only positive knowledge is trusted: a target missing from the cache is "unknown",
+    never "does not exist", so eviction can cost a round trip but never a wrong verb.
+    """
+
+    def __init__(self, name, config_ttl=DEFAULT_CONFIG_TTL, max_entries=5000):
+        self.name = name
+        self.config_ttl = config_ttl
+        self.max_entries = max_entries
+        self._configs = OrderedDict()  # target -> (value, expires_at)
+        self._listing_expires_at = 0.0
+        self._listing_retry_at = 0.0
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    def _listing_wanted(self):
+        now = time.monotonic()
+        return now >= self._listing_expires_at and now >= self._listing_retry_at
+
+    def ensure_configurations(self, api_connection, logger=None):
+        """
+        Loads every configuration with one GET unless a fresh listing is already held.
+
+        Call it once before a run's first write, not per write. It is best-effort: a refused,
+        failed or timed-out listing is logged and retried no sooner than LOAD_RETRY_SECONDS
+        later, and writes simply fall back to POST, then PUT on 409.
+
+        Returns:
+            bool: True if a fresh listing is available, False otherwise.
+        """
+        if not self._listing_wanted():
+            return time.monotonic() < self._listing_expires_at
+        with self._load_lock:
+            if not self._listing_wanted():
+                # Another session loaded (or failed to load) it while we waited
+                return time.monotonic() < self._listing_expires_at
+            import requests  # Only reached with a live API connection
+            try:
+                response = api_connection.get(CONFIGURATIONS_ENDPOINT, timeout=LISTING_TIMEOUT, use_cache=False)
+                problem = None if response.status_code == 200 else f"returned {response.status_code}"
+                records = response.json() if problem is None else None
+            except (requests.exceptions.RequestException, ValueError) as e:
+                problem = f"failed ({e})"
+            if problem is not None:
+                self._listing_retry_at = time.monotonic() + LOAD_RETRY_SECONDS
+                if logger:
+                    logger.warning(f"Cluster state for {self.name}: configuration listing {problem}; retrying in {LOAD_RETRY_SECONDS}s")
+                return False
+            self.remember_configurations(records)
+            if logger:
+                logger.info(f"Cluster state for {self.name}: loaded {len(self._configs)} configurations")
+            return True
+
+    def remember_configurations(self, records):
+        """Replaces the known configurations with a full listing (global, domain '*' records only)."""
+        expires_at = time.monotonic() + self.config_ttl
+        stored = index_configurations(records)
+        with self._lock:
+            self._configs = OrderedDict((key, (value, expires_at)) for key, value in stored.items())
+            while len(self._configs) > self.max_entries:
+                self._configs.popitem(last=False)
+            self._listing_expires_at = expires_at
+
+    def exists(self, config_name, scope="*", reseller="*"):
+        """True if the config is known to exist; None if unknown."""
+        key = target_key(config_name, scope, reseller)
+        with self._lock:
+            entry = self._configs.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() >= entry[1]:
+                del self._configs[key]
+                return None
+            self._configs.move_to_end(key)
+            return True
+
+    def record_write(self, task, status_code):
+        """Updates the state after any session wrote task: success stores the value, anything else drops the entry."""
+        key = target_key(task.config_name, task.scope, task.reseller)
+        with self._lock:
+            if status_code is not None and 200 <= status_code < 300:
+                self._configs[key] = (task.config_value, time.monotonic() + self.config_ttl)
+                self._configs.move_to_end(key)
+                while len(self._configs) > self.max_entries:
+                    self._configs.popitem(last=False)
+            else:
+                self._configs.pop(key, None)
+
+_states = {}
+_states_lock = threading.Lock()
+
+def get_cluster_state(api_url, access_token, **kwargs):
+    """
+    Returns the process-wide state for a cluster and credential (shared by every session and job thread).
+
+    Keyed like utils.http_cache.get_shared_cache: what a listing shows depends on who asked,
+    so a different token never sees it. The key holds a hash of the token, never the token.
+    """
+    key = (cluster_host(api_url), hashlib.sha256(str(access_token).encode("utf-8")).hexdigest())
+    with _states_lock:
+        if key not in _states:
+            _states[key] = ClusterState(key[0], **kwargs)
+        return _states[key]
+
+class TokenCache:
+    """Process-wide cache of OAuth token responses, keyed by a hash of the credentials (never the credentials)."""
+
+    def __init__(self):
+        self._tokens = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def credential_key(*parts):
+        return hashlib.sha256("\0".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._tokens.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() >= entry[1]:
+                del self._tokens[key]
+                return None
+            return entry[0]
+
+    def store(self, key, token_data):
+        """Caches a token response until TOKEN_EXPIRY_MARGIN before its expires_in (not cached without one)."""
+        try:
+            lifetime = float(token_data.get("expires_in", 0)) - TOKEN_EXPIRY_MARGIN
+        except (TypeError, ValueError):
+            return
+        if lifetime <= 0:
+            return
+        with self._lock:
+            self._tokens[key] = (token_data, time.monotonic() + lifetime)
+
+_token_cache = TokenCache()
+
+def get_token_cache():
+    return _token_cache
@@ -0,0 +1,8 @@
+import os
+
+# Fixed (connect, read) seconds for whole-cluster listings (configurations, domains), never adaptive
+LISTING_TIMEOUT = (5.0, float(os.getenv("API_LISTING_READ_TIMEOUT", "120")))
+
+def cluster_host(api_url):
+    """Lower-cased host of an API URL ('https://API.x.com/' -> 'api.x.com'); the key of every per-cluster registry."""
+    return api_url.replace("https://", "").replace("http://", "").strip().strip("/").split("/", 1)[0].lower()
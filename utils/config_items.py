@@ -0,0 +1,92 @@
+import sys
+from dataclasses import dataclass, replace
+
+DEFAULT_SCOPE = "*"
+DEFAULT_RESELLER = "*"
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+def parse_scope_codes(raw_scopes):
+    """Normalizes a blueprint 'scope'/'scopes' field ("su,res" or ["su", "res"]) into a list of codes."""
+    if not raw_scopes:
+        return []
+    if isinstance(raw_scopes, str):
+        return [scope.strip() for scope in raw_scopes.split(",") if scope.strip()]
+    return list(raw_scopes)
+
+def parse_names(raw_names):
+    """Normalizes a 'depends_on' field ("A,B" or ["A", "B"]) into a tuple of interned config names."""
+    return tuple(_intern(name) for name in parse_scope_codes(raw_names))
+
+@dataclass(frozen=True, slots=True)
+class WriteTask:
+    """
+    A single (config, scope, reseller) write. One ConfigItem fans out into one task per scope.
+
+    depends_on only affects scheduling (see utils.scheduling); it is never sent.
+    """
+    config_name: str
+    config_value: str
+    scope: str = DEFAULT_SCOPE
+    reseller: str = DEFAULT_RESELLER
+    depends_on: tuple = ()
+
+    def payload(self, base_payload):
+        """Returns the API body for this task layered on top of base_payload (which is not modified)."""
+        payload = dict(base_payload)
+        payload["config-name"] = self.config_name
+        payload["config-value"] = self.config_value
+        payload["user-scope"] = self.scope
+        payload["reseller"] = self.reseller
+        return payload
+
+@dataclass(frozen=True, slots=True)
+class ConfigItem:
+    """
+    Immutable, slotted form of one blueprint entry.
+
+    Config names, scopes and reseller names repeat across every customer and cluster,
+    so they are interned and shared between all items instead of living in per-item dicts.
+    """
+    config_name: str
+    config_value: str
+    scopes: tuple = ()
+    reseller: str = None
+    depends_on: tuple = ()
+
+    @classmethod
+    def from_dict(cls, config, resolve_scope=None):
+        """
+        Builds an item from a blueprint dict.
+
+        Args:
+            config (dict): Entry with 'config_name', 'config_value' and optional 'scope'/'scopes'/'reseller'/'depends_on'.
+            resolve_scope (callable, optional): Maps a scope code (e.g. 'su') to the full API name.
+                May raise ValueError for unknown codes. Codes are kept as-is if omitted.
+        """
+        raw_scopes = config.get("scopes") if "scopes" in config else config.get("scope")
+        codes = parse_scope_codes(raw_scopes)
+        scopes = tuple(_intern(resolve_scope(code) if resolve_scope else code) for code in codes)
+        return cls(
+            config_name=_intern(config["config_name"]),
+            config_value=config["config_value"],
+            scopes=scopes,
+            reseller=_intern(config.get("reseller")),
+            depends_on=parse_names(config.get("depends_on")),
+        )
+
+    @property
+    def is_reseller(self):
+        return self.reseller is not None
+
+    def with_value(self, value):
+        """Returns a copy carrying a new (e.g. user-entered) value."""
+        return replace(self, config_value=value)
+
+    def write_tasks(self):
+        """Yields one WriteTask per target scope ('*' when the entry lists none)."""
+        value = str(self.config_value)
+        reseller = self.reseller if self.reseller is not None else DEFAULT_RESELLER
+        for scope in self.scopes or (DEFAULT_SCOPE,):
+            yield WriteTask(self.config_name, value, scope, reseller, self.depends_on)
@@ -0,0 +1,42 @@
+import os
+
+from utils.clusters import cluster_host
+
+DEFAULT_ENV_FILE = ".env"
+
+def load_env(env_file=DEFAULT_ENV_FILE):
+    """
+    Loads KEY=VALUE pairs from a .env file (if present) and overlays the process environment.
+
+    Args:
+        env_file (str, optional): Path to the .env file. Missing files are ignored.
+
+    Returns:
+        dict: The merged variables. 'API_TOKEN' is always present (None if unset).
+    """
+    env_vars = {}
+    if env_file and os.path.exists(env_file):
+        with open(env_file, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#") or "=" not in line:
+                    continue
+                key, value = line.split("=", 1)
+                env_vars[key.strip()] = value.strip().strip('"').strip("'")
+
+    # Real environment variables win over the .env file
+    env_vars.update(os.environ)
+    env_vars.setdefault("API_TOKEN", None)
+    return env_vars
+
+def cluster_token_var(api_url):
+    """Per-cluster token variable name, e.g. https://api.example.com -> API_TOKEN_API_EXAMPLE_COM."""
+    return "API_TOKEN_" + "".join(c if c.isalnum() else "_" for c in cluster_host(api_url)).upper()
+
+def get_cluster_token(env_vars, api_url=None):
+    """Returns the token for api_url, preferring API_TOKEN_<HOST> over the generic API_TOKEN."""
+    if api_url:
+        token = env_vars.get(cluster_token_var(api_url))
+        if token:
+            return token
+    return env_vars.get("API_TOKEN")
@@ -0,0 +1,214 @@
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from utils.clusters import cluster_host
+
+DEFAULT_HISTORY_DB = os.getenv("HISTORY_DB_PATH", os.path.join("data", "history.db"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS writes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL,
+    ts REAL NOT NULL,
+    cluster TEXT NOT NULL,
+    customer TEXT,
+    config_name TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    reseller TEXT NOT NULL,
+    config_value TEXT,
+    verb TEXT NOT NULL,
+    status INTEGER,
+    ok INTEGER NOT NULL,
+    error TEXT,
+    latency REAL
+);
+CREATE INDEX IF NOT EXISTS idx_writes_config ON writes (config_name, ok, cluster);
+CREATE INDEX IF NOT EXISTS idx_writes_cluster ON writes (cluster, ts);
+CREATE INDEX IF NOT EXISTS idx_writes_customer ON writes (customer, ts);
+CREATE INDEX IF NOT EXISTS idx_writes_run ON writes (run_id);
+
+-- One row per (run, cluster, customer), kept current by record_many so listing runs never scans writes
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT NOT NULL,
+    cluster TEXT NOT NULL,
+    customer TEXT NOT NULL,
+    writes INTEGER NOT NULL,
+    failed INTEGER NOT NULL,
+    started_at REAL NOT NULL,
+    finished_at REAL NOT NULL,
+    PRIMARY KEY (run_id, cluster, customer)
+);
+CREATE INDEX IF NOT EXISTS idx_runs_finished ON runs (finished_at);
+"""
+
+_UPSERT_RUN = """
+INSERT INTO runs (run_id, cluster, customer, writes, failed, started_at, finished_at) VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (run_id, cluster, customer) DO UPDATE SET
+    writes = writes + excluded.writes,
+    failed = failed + excluded.failed,
+    started_at = MIN(started_at, excluded.started_at),
+    finished_at = MAX(finished_at, excluded.finished_at)
+"""
+
+_COLUMNS = ("run_id", "ts", "cluster", "customer", "config_name", "scope", "reseller",
+            "config_value", "verb", "status", "ok", "error", "latency")
+
+def new_run_id():
+    """Short, sortable-enough id stamped on every write of one run."""
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+class TransactionHistory:
+    """
+    Indexed local store of every configuration write outcome, across runs and frontends.
+
+    Same layout and connection handling as JobQueue: one SQLite file (HISTORY_DB_PATH,
+    default data/history.db), WAL mode, a fresh connection per call. Clusters are stored
+    as bare lower-cased hosts (see clusters.cluster_host), whichever frontend wrote them.
+    """
+
+    def __init__(self, db_path=DEFAULT_HISTORY_DB):
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._session() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    @contextmanager
+    def _session(self):
+        """Yields a connection that is committed (or rolled back) and closed on exit."""
+        conn = self._connect()
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def record_many(self, rows):
+        """Inserts a batch of row dicts (keys from _COLUMNS) and updates their runs summary in one transaction."""
+        if not rows:
+            return
+        with self._session() as conn:
+            self._insert(conn, rows)
+
+    def replace_run(self, run_id, rows):
+        """Replaces every write of run_id with rows in one transaction, so importing the same run twice is harmless."""
+        with self._session() as conn:
+            conn.execute("DELETE FROM writes WHERE run_id = ?", (run_id,))
+            conn.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+            self._insert(conn, rows)
+
+    @staticmethod
+    def _insert(conn, rows):
+        placeholders = ", ".join("?" for _ in _COLUMNS)
+        conn.executemany(f"INSERT INTO writes ({', '.join(_COLUMNS)}) VALUES ({placeholders})",
+                         [tuple(row.get(column) for column in _COLUMNS) for row in rows])
+        runs = {}
+        for row in rows:
+            key = (row["run_id"], row["cluster"], row.get("customer") or "")
+            writes, failed, started_at, finished_at = runs.get(key, (0, 0, row["ts"], row["ts"]))
+            runs[key] = (writes + 1, failed + (0 if row.get("ok") else 1), min(started_at, row["ts"]), max(finished_at, row["ts"]))
+        conn.executemany(_UPSERT_RUN, [key + totals for key, totals in runs.items()])
+
+    def query(self, cluster=None, customer=None, config_name=None, run_id=None, failed_only=False, limit=500):
+        """
+        Returns matching writes, newest first.
+
+        Args:
+            cluster (str): Cluster host or URL.
+            customer (str): Exact customer name.
+            config_name (str): Exact config name.
+            run_id (str): Exact run id.
+            failed_only (bool): Only writes that errored or returned a non-2xx status.
+            limit (int): Maximum rows returned.
+        """
+        query = f"SELECT id, {', '.join(_COLUMNS)} FROM writes"
+        clauses, params = [], []
+        for column, value in (("cluster", cluster and cluster_host(cluster)), ("customer", customer), ("config_name", config_name), ("run_id", run_id)):
+            if value:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if failed_only:
+            clauses.append("ok = 0")
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        with self._session() as conn:
+            return [dict(row) for row in conn.execute(query, params)]
+
+    def list_runs(self, limit=50):
+        """One summary row per run, cluster and customer: write/failure counts and time span, most recent first."""
+        with self._session() as conn:
+            return [dict(row) for row in conn.execute(
+                "SELECT run_id, cluster, NULLIF(customer, '') AS customer, writes, failed, started_at, finished_at "
+                "FROM runs ORDER BY finished_at DESC LIMIT ?", (limit,)
+            )]
+
+class TransactionRecorder:
+    """
+    Buffers the write outcomes of one run against one cluster/customer and inserts them in batches.
+
+    Thread-safe, so parallel senders can share it. Call close() at the end of the run to
+    flush the last partial batch.
+    """
+
+    def __init__(self, history, run_id, cluster, customer=None, batch_size=100):
+        self.history = history
+        self.run_id = run_id
+        self.cluster = cluster_host(cluster)
+        self.customer = customer
+        self.batch_size = batch_size
+        self._buffer = []
+        self._lock = threading.Lock()
+
+    def record(self, request, result=None, error=None):
+        """
+        Records one PlannedRequest outcome.
+
+        Args:
+            request (PlannedRequest): The write that was attempted.
+            result (PlanResult): Its result, or None if it raised.
+            error (Exception|str): The exception, when it raised.
+        """
+        task = request.task
+        status = result.response.status_code if result is not None else None
+        row = {
+            "run_id": self.run_id,
+            "ts": time.time(),
+            "cluster": self.cluster,
+            "customer": self.customer,
+            "config_name": task.config_name,
+            "scope": task.scope,
+            "reseller": task.reseller,
+            "config_value": task.config_value,
+            "verb": result.verb if result is not None else request.method,
+            "status": status,
+            "ok": int(status is not None and 200 <= status < 300),
+            "error": str(error) if error is not None else None,
+            "latency": result.elapsed if result is not None else None,
+        }
+        with self._lock:
+            self._buffer.append(row)
+            if len(self._buffer) < self.batch_size:
+                return
+            batch, self._buffer = self._buffer, []
+        self.history.record_many(batch)
+
+    def flush(self):
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        self.history.record_many(batch)
+
+    def close(self):
+        self.flush()
@@ -0,0 +1,119 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from utils.clusters import cluster_host
+
+# First matching prefix wins; endpoints that match nothing use default_ttl (0 = never cached)
+DEFAULT_TTL_RULES = (
+    ("ns-api/v2/domains", 300),
+    ("ns-api/v2/configurations", 60),
+)
+
+class CacheEntry:
+    __slots__ = ("response", "etag", "expires_at")
+
+    def __init__(self, response, etag, expires_at):
+        self.response = response
+        self.etag = etag
+        self.expires_at = expires_at
+
+    @property
+    def is_fresh(self):
+        return time.monotonic() < self.expires_at
+
+class ResponseCache:
+    """
+    Thread-safe LRU cache of GET responses for one cluster.
+
+    Entries expire after a per-endpoint TTL. Expired entries that carried an ETag are
+    kept so the next GET can revalidate them with If-None-Match (a 304 renews the entry
+    without downloading the body). Any write to an endpoint drops cached reads under it.
+
+    Args:
+        max_entries (int): LRU bound; the least recently used entry is evicted beyond this.
+        ttl_rules (iterable): (endpoint_prefix, ttl_seconds) pairs.
+        default_ttl (float): TTL for endpoints matching no rule.
+    """
+
+    def __init__(self, max_entries=512, ttl_rules=DEFAULT_TTL_RULES, default_ttl=0):
+        self.max_entries = max_entries
+        self.ttl_rules = tuple(ttl_rules)
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def ttl_for(self, endpoint):
+        for prefix, ttl in self.ttl_rules:
+            if endpoint.startswith(prefix):
+                return ttl
+        return self.default_ttl
+
+    def lookup(self, endpoint):
+        """Returns the CacheEntry for endpoint (fresh or revalidatable) or None."""
+        with self._lock:
+            entry = self._entries.get(endpoint)
+            if entry is None:
+                self.misses += 1
+                return None
+            if not entry.is_fresh and not entry.etag:
+                del self._entries[endpoint]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(endpoint)
+            if entry.is_fresh:
+                self.hits += 1
+            return entry
+
+    def store(self, endpoint, response):
+        """Caches a successful GET response if its endpoint has a TTL."""
+        ttl = self.ttl_for(endpoint)
+        if ttl <= 0 or response.status_code != 200:
+            return
+        entry = CacheEntry(response, response.headers.get("ETag"), time.monotonic() + ttl)
+        with self._lock:
+            self._entries[endpoint] = entry
+            self._entries.move_to_end(endpoint)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def renew(self, endpoint):
+        """Marks a revalidated (304) entry fresh again and returns it."""
+        with self._lock:
+            entry = self._entries.get(endpoint)
+            if entry is not None:
+                entry.expires_at = time.monotonic() + self.ttl_for(endpoint)
+                self.revalidations += 1
+            return entry
+
+    def invalidate(self, endpoint_prefix=""):
+        """Drops every cached endpoint starting with endpoint_prefix (everything by default)."""
+        with self._lock:
+            for endpoint in [e for e in self._entries if e.startswith(endpoint_prefix)]:
+                del self._entries[endpoint]
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses, "revalidations": self.revalidations}
+
+_shared_caches = {}
+_shared_lock = threading.Lock()
+
+def get_shared_cache(api_url, access_token, **kwargs):
+    """
+    Returns the process-wide cache for a cluster and credential.
+
+    Streamlit runs every session in the same process, so sessions (and CLI threads)
+    using the same token on the same cluster share one cache. Responses depend on who
+    asked, so a different token never sees them; the key holds a hash of the token,
+    never the token. kwargs only apply on first creation.
+    """
+    key = (cluster_host(api_url), hashlib.sha256(str(access_token).encode("utf-8")).hexdigest())
+    with _shared_lock:
+        if key not in _shared_caches:
+            _shared_caches[key] = ResponseCache(**kwargs)
+        return _shared_caches[key]
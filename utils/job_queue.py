@@ -0,0 +1,169 @@
+import json
+import os
+import sqlite3
+import time
+import logging
+from contextlib import contextmanager
+
+DEFAULT_JOB_DB = os.getenv("JOB_DB_PATH", os.path.join("data", "jobs.db"))
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    cluster TEXT NOT NULL,
+    customer TEXT,
+    blueprint TEXT NOT NULL,
+    answers TEXT NOT NULL,
+    status TEXT NOT NULL,
+    worker TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, id);
+CREATE TABLE IF NOT EXISTS job_logs (
+    job_id INTEGER NOT NULL,
+    ts REAL NOT NULL,
+    line TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_job_logs_job ON job_logs (job_id, ts);
+"""
+
+class JobQueue:
+    """
+    Persistent FIFO of blueprint push jobs backed by a local SQLite file.
+
+    Safe to share between processes: every call opens its own connection and claims
+    are done inside an IMMEDIATE transaction so two workers never take the same job.
+    """
+
+    def __init__(self, db_path=DEFAULT_JOB_DB):
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._session() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    @contextmanager
+    def _session(self):
+        """Yields a connection that is committed (or rolled back) and closed on exit."""
+        conn = self._connect()
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def submit(self, cluster, customer, blueprint, answers):
+        """Queues one (cluster, customer, blueprint, answers) push and returns its job id."""
+        with self._session() as conn:
+            cursor = conn.execute(
+                "INSERT INTO jobs (cluster, customer, blueprint, answers, status, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (cluster, customer, blueprint, json.dumps(answers), JOB_QUEUED, time.time())
+            )
+            return cursor.lastrowid
+
+    def claim(self, worker_id):
+        """Atomically moves the oldest queued job to 'running'. Returns the job dict or None."""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT * FROM jobs WHERE status = ? ORDER BY id LIMIT 1", (JOB_QUEUED,)).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, worker = ?, started_at = ? WHERE id = ?",
+                (JOB_RUNNING, worker_id, time.time(), row["id"])
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        job = dict(row)
+        job["answers"] = json.loads(job["answers"])
+        job["status"] = JOB_RUNNING
+        job["worker"] = worker_id
+        return job
+
+    def finish(self, job_id, error=None):
+        status = JOB_FAILED if error else JOB_SUCCEEDED
+        with self._session() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+                (status, error, time.time(), job_id)
+            )
+
+    def append_logs(self, job_id, lines):
+        """Stores a batch of (timestamp, line) tuples for job_id."""
+        if not lines:
+            return
+        with self._session() as conn:
+            conn.executemany("INSERT INTO job_logs (job_id, ts, line) VALUES (?, ?, ?)",
+                             [(job_id, ts, line) for ts, line in lines])
+
+    def list_jobs(self, status=None, limit=200):
+        query = "SELECT id, cluster, customer, blueprint, status, worker, error, created_at, started_at, finished_at FROM jobs"
+        params = []
+        if status:
+            query += " WHERE status = ?"
+            params.append(status)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        with self._session() as conn:
+            return [dict(row) for row in conn.execute(query, params)]
+
+    def get_logs(self, job_id):
+        with self._session() as conn:
+            return [row["line"] for row in conn.execute("SELECT line FROM job_logs WHERE job_id = ? ORDER BY ts, rowid", (job_id,))]
+
+    def requeue_running(self, worker_prefix=None):
+        """Puts 'running' jobs back in the queue (e.g. after a worker host crashed). Returns the count."""
+        query = "UPDATE jobs SET status = ?, worker = NULL, started_at = NULL WHERE status = ?"
+        params = [JOB_QUEUED, JOB_RUNNING]
+        if worker_prefix:
+            query += " AND worker LIKE ?"
+            params.append(f"{worker_prefix}%")
+        with self._session() as conn:
+            return conn.execute(query, params).rowcount
+
+class JobLogHandler(logging.Handler):
+    """Logging handler that buffers formatted records and writes them to a job's log in batches."""
+
+    def __init__(self, job_queue, job_id, batch_size=50):
+        super().__init__()
+        self.job_queue = job_queue
+        self.job_id = job_id
+        self.batch_size = batch_size
+        self._buffer = []
+
+    def emit(self, record):
+        try:
+            self._buffer.append((record.created, self.format(record)))
+            if len(self._buffer) >= self.batch_size:
+                self.flush()
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        buffer, self._buffer = self._buffer, []
+        self.job_queue.append_logs(self.job_id, buffer)
+
+    def close(self):
+        self.flush()
+        super().close()
@@ -1,12 +1,12 @@
 import logging
 import os
-from logging.handlers import RotatingFileHandler
 
 # Default configuration values
 DEFAULT_LOG_LEVEL = os.getenv("LOG_LEVEL", "DEBUG")
 DEFAULT_LOG_DIR = os.getenv("LOG_DIR", os.path.join(os.path.dirname(__file__), "logs"))
 DEFAULT_LOG_FILE = os.path.join(DEFAULT_LOG_DIR, "netsapiens_api.log")
 DEFAULT_LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+LOGGER_NAME = "netsapiens_api"
 
 # Flag to prevent multiple configurations
 _logging_configured = False
@@ -27,10 +27,11 @@ def setup_logging(log_level=None, log_dir=None, log_file=None, log_format=None):
     os.makedirs(log_dir, exist_ok=True)
 
     # Create a named logger
-    logger = logging.getLogger("netsapiens_api")
+    logger = logging.getLogger(LOGGER_NAME)
     logger.setLevel(getattr(logging, log_level.upper(), logging.DEBUG))
 
-    # Create handlers
+    # Create handlers (logging.handlers pulls in socket/pickle, so import it only when configuring)
+    from logging.handlers import RotatingFileHandler
     file_handler = RotatingFileHandler(
         log_file,
         maxBytes=5 * 1024 * 1024,  # 5 MB
@@ -51,5 +52,11 @@ def setup_logging(log_level=None, log_dir=None, log_file=None, log_format=None):
     _logger = logger
     return _logger
 
-# Configure logging on import with defaults
-setup_logging()
\ No newline at end of file
+def get_logger():
+    """
+    Returns the shared named logger without configuring it.
+
+    Importing modules can bind this at module level for free; handlers and the log
+    directory are only created once setup_logging() runs on first real use.
+    """
+    return logging.getLogger(LOGGER_NAME)
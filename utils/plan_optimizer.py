@@ -0,0 +1,67 @@
+from dataclasses import dataclass, replace
+
+from utils.config_items import DEFAULT_SCOPE
+
+@dataclass(frozen=True, slots=True)
+class OptimizationReport:
+    """Write requests before and after optimize_items, and what each rule removed."""
+    writes_before: int
+    writes_after: int
+    collapsed: int
+    merged: int
+
+    @property
+    def saved(self):
+        return self.writes_before - self.writes_after
+
+def _write_count(items):
+    return sum(len(item.scopes) or 1 for item in items)
+
+def optimize_items(items, all_scopes):
+    """
+    Removes redundant writes from a rendered queue.
+
+    1. An entry whose scopes cover every scope in all_scopes is sent once with user-scope '*'
+       instead of once per scope.
+    2. When several entries write the same (config, scope, reseller) target, only the last one
+       is kept, at its own position; earlier writes would be overwritten anyway.
+
+    Rule 1 assumes the cluster has no scope-specific rows for those configs that would outrank
+    the '*' row, which is why the pass is opt-in.
+
+    Args:
+        items (list): Rendered ConfigItems, in send order.
+        all_scopes (iterable): Every API scope name (e.g. SCOPE_MAPPING.values()).
+
+    Returns:
+        tuple: (optimized list of ConfigItems, OptimizationReport)
+    """
+    all_scopes = frozenset(all_scopes)
+    writes_before = _write_count(items)
+
+    collapsed = 0
+    widened = []
+    for item in items:
+        if all_scopes and all_scopes.issubset(item.scopes):
+            collapsed += len(item.scopes) - 1
+            item = replace(item, scopes=())
+        widened.append(item)
+
+    # Walk backwards so the last write to each target is the one that survives
+    seen = set()
+    kept = []
+    merged = 0
+    for item in reversed(widened):
+        reseller = item.reseller
+        scopes = item.scopes or (DEFAULT_SCOPE,)
+        fresh = tuple(scope for scope in scopes if (item.config_name, scope, reseller) not in seen)
+        merged += len(scopes) - len(fresh)
+        seen.update((item.config_name, scope, reseller) for scope in fresh)
+        if not fresh:
+            continue
+        if item.scopes and len(fresh) != len(item.scopes):
+            item = replace(item, scopes=fresh)
+        kept.append(item)
+    kept.reverse()
+
+    return kept, OptimizationReport(writes_before, _write_count(kept), collapsed, merged)
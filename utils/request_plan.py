@@ -0,0 +1,88 @@
+import json
+import time
+from dataclasses import dataclass
+
+from utils.config_items import WriteTask
+
+CONFIGURATIONS_ENDPOINT = "ns-api/v2/configurations"
+
+# Fields shared by every configuration write, from either frontend
+BASE_PAYLOAD = {
+    "admin-ui-account-type": "*",
+    "user": "*",
+    "domain": "*",
+    "core-server": "*",
+}
+
+@dataclass(frozen=True, slots=True)
+class PlannedRequest:
+    """
+    One ready-to-send configuration write.
+
+    The body is serialized once at compile time; the send loop only hands bytes to APIHelper.
+    The endpoint is relative, so one plan can be executed against any cluster.
+    """
+    method: str
+    endpoint: str
+    body: bytes
+    task: WriteTask
+
+    @property
+    def config_name(self):
+        return self.task.config_name
+
+    @property
+    def scope(self):
+        return self.task.scope
+
+@dataclass(frozen=True, slots=True)
+class PlanResult:
+    request: PlannedRequest
+    response: object
+    verb: str
+    elapsed: float
+    conflict: bool = False  # True when a POST was answered 409 and retried as PUT
+
+def compile_task(task, description):
+    payload = task.payload(BASE_PAYLOAD)
+    payload["description"] = description
+    body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return PlannedRequest("POST", CONFIGURATIONS_ENDPOINT, body, task)
+
+def compile_plan(items, description):
+    """
+    Turns a rendered queue (ConfigItems with their final values) into an immutable tuple of PlannedRequests.
+
+    Args:
+        items (iterable): ConfigItem objects, in send order.
+        description (str): 'description' field stamped on every write (identifies the frontend).
+    """
+    return tuple(compile_task(task, description) for item in items for task in item.write_tasks())
+
+def execute_planned_request(api, request, state=None):
+    """
+    Sends one planned write: POST, then PUT with the same body if the config already exists (409).
+
+    With a ClusterState, a config already known to exist is PUT directly (one request instead
+    of POST + 409 + PUT), falling back to POST if the PUT finds it gone (404). The outcome is
+    recorded in the state so every session sharing it sees the write. The state is only read
+    here; load its listing once per run (ClusterState.ensure_configurations) before the first write.
+    """
+    start_time = time.perf_counter()
+    task = request.task
+    if state is not None and state.exists(task.config_name, task.scope, task.reseller):
+        response = api.send_raw("PUT", request.endpoint, request.body)
+        verb = "PUT"
+        if response.status_code == 404:
+            response = api.send_raw(request.method, request.endpoint, request.body)
+            verb = request.method
+    else:
+        response = api.send_raw(request.method, request.endpoint, request.body)
+        verb = request.method
+    conflict = response.status_code == 409
+    if conflict:
+        response = api.send_raw("PUT", request.endpoint, request.body)
+        verb = "PUT"
+    if state is not None:
+        state.record_write(task, response.status_code)
+    return PlanResult(request, response, verb, time.perf_counter() - start_time, conflict)
@@ -0,0 +1,144 @@
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# Config name (or 'PREFIX_*' pattern) -> configs that must be written first.
+# Blueprint entries can add their own with "depends_on": "NAME" or ["NAME", ...].
+CONFIG_DEPENDENCIES = {
+    "PORTAL_VOICE_TEXT_TO_SPEECH_*": ("PORTAL_VOICE_TEXT_TO_SPEECH",),
+    "PORTAL_VOICE_SPEECH_TO_TRANSCRIPTION_*": ("PORTAL_VOICE_SPEECH_TO_TRANSCRIPTION",),
+    "PORTAL_VOICE_STREAMING_SPEECH_TO_TEXT_VENDOR": ("PORTAL_VOICE_STREAMING_SPEECH_TO_TEXT",),
+    "PORTAL_VOICE_TRANSCRIPTION_SENTIMENT_*": ("PORTAL_VOICE_TRANSCRIPTION_SENTIMENT",),
+    "PORTAL_USERS_VMAIL_TRANSCRIPTION_DEEPGRAM_NAME": ("PORTAL_USERS_VMAIL_TRANSCRIPTION_DEEPGRAM",),
+    "PORTAL_CSS_COLOR_MENU_BAR_*": ("PORTAL_CSS_COLOR_MENU_BAR",),
+    "PORTAL_WEBPHONE_PWA_*": ("PORTAL_WEBPHONE_ENABLE_PWA",),
+    "PORTAL_DOMAINS_RECORDING_QUOTA_*": ("PORTAL_DOMAINS_RECORDING_QUOTA",),
+    "PORTAL_ALLOW_AUDIO_MONITOR_ON_*": ("PORTAL_ALLOW_AUDIO_MONITOR",),
+}
+
+def prerequisites_for(config_name, declared=(), rules=CONFIG_DEPENDENCIES):
+    """Config names that must be written before config_name: matching rules plus the entry's own depends_on."""
+    names = set(declared)
+    for pattern, required in rules.items():
+        if pattern == config_name or (pattern.endswith("*") and config_name.startswith(pattern[:-1])):
+            names.update(required)
+    names.discard(config_name)
+    return names
+
+def build_dependency_graph(plan, rules=CONFIG_DEPENDENCIES):
+    """
+    Maps each PlannedRequest (by index) to the indexes it must wait for.
+
+    A write waits for every write of its prerequisite configs that is in the plan (prerequisites
+    not being written are assumed to be in place already), and for earlier writes to the same
+    (config, scope, reseller) target, so the blueprint's last-one-wins order is kept.
+    """
+    indexes_by_name = {}
+    for index, request in enumerate(plan):
+        indexes_by_name.setdefault(request.task.config_name, []).append(index)
+
+    prerequisites = []
+    last_write_to = {}
+    for index, request in enumerate(plan):
+        task = request.task
+        waits_for = set()
+        for name in prerequisites_for(task.config_name, task.depends_on, rules):
+            waits_for.update(indexes_by_name.get(name, ()))
+        target = (task.config_name, task.scope, task.reseller)
+        if target in last_write_to:
+            waits_for.add(last_write_to[target])
+        last_write_to[target] = index
+        prerequisites.append(waits_for)
+    return prerequisites
+
+def topological_waves(plan, prerequisites):
+    """
+    Groups the plan into waves (Kahn levels): every write in a wave only depends on earlier waves.
+
+    Returns:
+        list: Lists of indexes, each in plan order.
+
+    Raises:
+        ValueError: If the declared dependencies form a cycle.
+    """
+    remaining = {index: set(waits_for) for index, waits_for in enumerate(prerequisites)}
+    waves = []
+    while remaining:
+        ready = sorted(index for index, waits_for in remaining.items() if not waits_for)
+        if not ready:
+            names = sorted({plan[index].task.config_name for index in remaining})
+            raise ValueError(f"Dependency cycle between configs: {', '.join(names)}")
+        waves.append(ready)
+        for index in ready:
+            del remaining[index]
+        for waits_for in remaining.values():
+            waits_for.difference_update(ready)
+    return waves
+
+def execute_dag(plan, prerequisites, send_fn, max_workers=4):
+    """
+    Sends the plan on a thread pool, starting each write as soon as its prerequisites are done.
+
+    A write whose prerequisite config failed is skipped (a failed earlier write to the same
+    target only delays the later one). If send_fn raises, nothing new is started,
+    the writes in flight finish, and the first exception is re-raised.
+
+    Args:
+        plan (sequence): PlannedRequests.
+        prerequisites (list): From build_dependency_graph.
+        send_fn (callable): send_fn(request) -> True if the write succeeded.
+        max_workers (int): Writes in flight at once.
+
+    Returns:
+        tuple: (indexes that failed, indexes skipped because a prerequisite failed).
+    """
+    topological_waves(plan, prerequisites)  # Reject cycles before the first write
+
+    dependents = {index: [] for index in range(len(plan))}
+    waiting_on = {}
+    for index, waits_for in enumerate(prerequisites):
+        waiting_on[index] = len(waits_for)
+        for prerequisite in waits_for:
+            dependents[prerequisite].append(index)
+
+    failed, skipped = [], set()
+    error = None
+
+    def release(index, ok):
+        """Marks index done; returns the dependents that became ready (skipping those of a failure)."""
+        ready = []
+        for dependent in dependents[index]:
+            if dependent in skipped:
+                continue
+            if not ok and plan[dependent].task.config_name != plan[index].task.config_name:
+                skip(dependent)
+                continue
+            waiting_on[dependent] -= 1
+            if waiting_on[dependent] == 0:
+                ready.append(dependent)
+        return ready
+
+    def skip(index):
+        skipped.add(index)
+        for dependent in dependents[index]:
+            if dependent not in skipped:
+                skip(dependent)
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="plan") as pool:
+        in_flight = {pool.submit(send_fn, plan[index]): index for index, count in waiting_on.items() if count == 0}
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = in_flight.pop(future)
+                try:
+                    ok = bool(future.result())
+                except Exception as e:
+                    error = error or e
+                    ok = False
+                if not ok and error is None:
+                    failed.append(index)
+                if error is not None:
+                    continue
+                for ready in release(index, ok):
+                    in_flight[pool.submit(send_fn, plan[ready])] = ready
+    if error is not None:
+        raise error
+    return sorted(failed), sorted(skipped)
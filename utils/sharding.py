@@ -0,0 +1,171 @@
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+
+from utils.clusters import cluster_host
+
+# Customer slot of the work unit that carries a cluster's customer-invariant writes
+SHARED_UNIT = "*"
+SHARD_FORMAT_VERSION = 1
+
+def parse_shard(spec):
+    """Parses 'i/N' (1 <= i <= N) into (i, N)."""
+    try:
+        index, count = (int(part) for part in str(spec).split("/", 1))
+    except ValueError:
+        raise ValueError(f"--shard expects i/N (e.g. 2/4), got '{spec}'.")
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"--shard {spec}: i must be between 1 and N.")
+    return index, count
+
+def shard_of(cluster, customer, count):
+    """
+    The shard (1..count) a (cluster, customer) unit belongs to.
+
+    A hash of the unit alone, so every node computes the same split without coordinating,
+    and adding customers or clusters never moves the units that already existed.
+    """
+    digest = hashlib.sha256(f"{cluster_host(cluster)}|{customer or ''}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count + 1
+
+def work_units(clusters, customer_names, shared=False):
+    """Every (cluster, customer) unit, preceded by one (cluster, SHARED_UNIT) per cluster when invariant writes are split out."""
+    units = []
+    for cluster in clusters:
+        if shared:
+            units.append((cluster, SHARED_UNIT))
+        units.extend((cluster, customer) for customer in customer_names)
+    return units
+
+def shard_units(units, index, count):
+    """
+    This shard's units, in work_units order.
+
+    Customer units are spread by shard_of. A cluster's SHARED_UNIT goes to every shard holding
+    one of its customer units, ahead of them: customer writes can depend on shared ones
+    (e.g. PORTAL_WEBPHONE_PWA_* on PORTAL_WEBPHONE_ENABLE_PWA) and shards do not wait for each
+    other, so each one sends the (idempotent) shared writes itself.
+    """
+    mine = {unit for unit in units if unit[1] != SHARED_UNIT and shard_of(*unit, count) == index}
+    clusters = {cluster for cluster, _ in mine}
+    return [unit for unit in units if unit in mine or (unit[1] == SHARED_UNIT and unit[0] in clusters)]
+
+def default_shard_output(index, count):
+    return os.path.join("data", f"shard-{index}-of-{count}.jsonl")
+
+class ShardJournal:
+    """
+    Portable JSON-lines record of one shard's run, for merging on another machine.
+
+    Lines: one 'shard' header, a 'write' per write outcome (same fields as the transaction
+    history), a 'unit' per finished (cluster, customer) unit and an 'end' trailer. Used as the
+    store behind a TransactionRecorder, so it takes the same record_many() batches.
+    """
+
+    def __init__(self, path, index, count, run_id):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "w")
+        self._write({"type": "shard", "version": SHARD_FORMAT_VERSION, "index": index, "count": count,
+                     "run_id": run_id, "host": socket.gethostname(),
+                     "started_at": time.time()})
+
+    def _write(self, record):
+        with self._lock:
+            self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+            self._file.flush()
+
+    def record_many(self, rows):
+        for row in rows:
+            self._write({"type": "write", **row})
+
+    def unit_done(self, cluster, customer, writes, failed, error=None):
+        self._write({"type": "unit", "cluster": cluster, "customer": customer,
+                     "writes": writes, "failed": failed, "error": error, "ts": time.time()})
+
+    def close(self):
+        self._write({"type": "end", "finished_at": time.time()})
+        with self._lock:
+            self._file.close()
+
+def read_shard(path):
+    """Returns (header, writes, units, finished) for one shard file; raises ValueError if it is not one."""
+    header, writes, units, finished = None, [], [], False
+    with open(path, "r") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                raise ValueError(f"{path}:{number} is not valid JSON (truncated shard file?)")
+            kind = record.pop("type", None)
+            if kind == "shard":
+                header = record
+            elif kind == "write":
+                writes.append(record)
+            elif kind == "unit":
+                units.append(record)
+            elif kind == "end":
+                finished = True
+    if header is None:
+        raise ValueError(f"{path} has no shard header; was it written by ui_configs.py --shard?")
+    return header, writes, units, finished
+
+def merge_shards(paths):
+    """
+    Combines shard files into one summary.
+
+    Raises:
+        ValueError: If the files disagree on N or on the run id, or contain the same shard twice.
+
+    Returns:
+        dict: run_id, shards, missing shard indexes, unfinished shards, units, writes (all rows),
+        failed writes, and per-cluster totals.
+    """
+    shards = {}
+    count = None
+    run_id = None
+    all_writes, all_units, unfinished = [], [], []
+    for path in paths:
+        header, writes, units, finished = read_shard(path)
+        if count is None:
+            count = header["count"]
+        elif header["count"] != count:
+            raise ValueError(f"{path} is shard {header['index']}/{header['count']}, but other files are out of {count}.")
+        if run_id is None:
+            run_id = header["run_id"]
+        elif header["run_id"] != run_id:
+            raise ValueError(f"{path} belongs to run {header['run_id']}, but other files to run {run_id}; run every shard with the same --run-id.")
+        if header["index"] in shards:
+            raise ValueError(f"Shard {header['index']}/{count} appears twice ({shards[header['index']]['path']} and {path}).")
+        shards[header["index"]] = {**header, "path": path, "finished": finished,
+                                   "writes": len(writes), "units": len(units)}
+        if not finished:
+            unfinished.append(header["index"])
+        all_writes.extend(writes)
+        all_units.extend(units)
+
+    clusters = {}
+    for row in all_writes:
+        totals = clusters.setdefault(row["cluster"], {"writes": 0, "failed": 0})
+        totals["writes"] += 1
+        totals["failed"] += 0 if row.get("ok") else 1
+
+    return {
+        "run_id": run_id,
+        "count": count,
+        "shards": [shards[index] for index in sorted(shards)],
+        "missing": [index for index in range(1, (count or 0) + 1) if index not in shards],
+        "unfinished": sorted(unfinished),
+        "units": all_units,
+        "writes": all_writes,
+        "failed": [row for row in all_writes if not row.get("ok")],
+        "clusters": clusters,
+    }
@@ -0,0 +1,92 @@
+import os
+import threading
+import time
+from collections import deque
+
+import requests
+
+from utils.clusters import cluster_host
+
+# Hard bounds for any single request (seconds)
+DEFAULT_CONNECT_TIMEOUT = float(os.getenv("API_CONNECT_TIMEOUT", "5"))
+DEFAULT_READ_TIMEOUT = float(os.getenv("API_READ_TIMEOUT", "30"))
+MIN_CONNECT_TIMEOUT = 1.0
+MIN_READ_TIMEOUT = 2.0
+
+class DeadlineExceeded(requests.exceptions.Timeout):
+    """Raised instead of sending a request once the run's overall time budget is spent."""
+
+class RunDeadline:
+    """Overall time budget for one run; every request's timeout is capped by what is left."""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        return self.expires_at - time.monotonic()
+
+    def check(self):
+        if self.remaining() <= 0:
+            raise DeadlineExceeded(f"Run deadline of {self.seconds:g}s exceeded")
+
+class LatencyTracker:
+    """
+    Rolling window of observed write latencies for one cluster.
+
+    Only writes are tracked and adaptively timed (see APIHelper._request): listing GETs take
+    far longer than a small POST, so a shared window would cut them off.
+
+    Once min_samples requests have been seen, timeouts follow the cluster instead of the
+    30 s worst case: read = p99 x multiplier, connect = p50 x multiplier, both clamped to
+    [MIN_*, DEFAULT_*]. Until then the defaults apply.
+    """
+
+    def __init__(self, window=200, min_samples=20, multiplier=3.0):
+        self.min_samples = min_samples
+        self.multiplier = multiplier
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct):
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+        return samples[index]
+
+    def timeouts(self):
+        """Returns the (connect, read) timeout tuple to use for the next request."""
+        with self._lock:
+            enough = len(self._samples) >= self.min_samples
+        if not enough:
+            return DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT
+        connect = min(DEFAULT_CONNECT_TIMEOUT, max(MIN_CONNECT_TIMEOUT, self.percentile(50) * self.multiplier))
+        read = min(DEFAULT_READ_TIMEOUT, max(MIN_READ_TIMEOUT, self.percentile(99) * self.multiplier))
+        return connect, read
+
+def cap_timeouts(timeouts, deadline=None):
+    """Caps a (connect, read) tuple (or a single number) by the deadline's remaining budget; raises DeadlineExceeded if none is left."""
+    if not isinstance(timeouts, tuple):
+        timeouts = (timeouts, timeouts)
+    if deadline is None:
+        return timeouts
+    deadline.check()
+    remaining = deadline.remaining()
+    return min(timeouts[0], remaining), min(timeouts[1], remaining)
+
+_trackers = {}
+_trackers_lock = threading.Lock()
+
+def get_latency_tracker(api_url, **kwargs):
+    """Returns the process-wide latency tracker for a cluster host."""
+    host = cluster_host(api_url)
+    with _trackers_lock:
+        if host not in _trackers:
+            _trackers[host] = LatencyTracker(**kwargs)
+        return _trackers[host]
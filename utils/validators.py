@@ -1,8 +1,9 @@
 import re
 import os
-import mimetypes
 import json
 
+from utils.clusters import LISTING_TIMEOUT
+
 def validate_extension(extension, logger=None):
     if not extension.isdigit():
         raise ValueError("Extension must be numeric (e.g., 1001).")
@@ -153,6 +154,7 @@ def validate_file_path(file_path, logger=None):
     return file_path
 
 def validate_image_file(file_path, logger=None):
+    import mimetypes  # Only needed here; loading the MIME tables is a noticeable part of startup
     mime_type = mimetypes.guess_type(file_path)[0]
     if not mime_type or not mime_type.startswith("image/"):
         raise ValueError(f"File {file_path} is not a recognized image type.")
@@ -289,4 +291,82 @@ def verify_domain_exists(api_connection, domain, logger=None):
             
     except Exception as e:
         if logger: logger.error(f"Error verifying domain: {e}")
-        return False
\ No newline at end of file
+        return False
+
+def fetch_domain_names(api_connection, page_size=None, max_workers=4, logger=None, timeout=LISTING_TIMEOUT):
+    """
+    Pulls the cluster's domain list and returns it as a set of lower-cased names.
+
+    Args:
+        api_connection (APIHelper): The active API connection.
+        page_size (int, optional): If set, the list is read in pages of this size
+            ('limit'/'start' query parameters), max_workers pages at a time, until a short page
+            or a batch with no new names (a server that ignores paging returns the same list every time).
+            If None, the whole list is fetched with a single call.
+        max_workers (int, optional): Concurrent page requests when paginating.
+        timeout (tuple, optional): (connect, read) seconds per listing call. Defaults to LISTING_TIMEOUT.
+
+    Returns:
+        set: Every domain name on the cluster.
+
+    Raises:
+        ValueError: If a listing call does not return 200.
+    """
+    def fetch(endpoint):
+        response = api_connection.get(endpoint, timeout=timeout)
+        if response.status_code != 200:
+            raise ValueError(f"Domain listing failed: GET {endpoint} returned {response.status_code}")
+        records = response.json()
+        return [record.get("domain", "") if isinstance(record, dict) else str(record) for record in records]
+
+    if not page_size:
+        names = fetch("ns-api/v2/domains")
+    else:
+        from concurrent.futures import ThreadPoolExecutor
+        names = set()
+        start = 0
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            while True:
+                offsets = [start + i * page_size for i in range(max_workers)]
+                pages = list(pool.map(lambda offset: fetch(f"ns-api/v2/domains?limit={page_size}&start={offset}"), offsets))
+                known = len(names)
+                for page in pages:
+                    names.update(page)
+                if any(len(page) < page_size for page in pages):
+                    break
+                if len(names) == known:
+                    if logger:
+                        logger.warning(f"Domain listing returned no new names at start={start}; the server seems to ignore paging")
+                    break
+                start = offsets[-1] + page_size
+
+    domains = {name.lower() for name in names if name}
+    if logger:
+        logger.info(f"Fetched {len(domains)} domains from the cluster")
+    return domains
+
+def verify_domains_exist(api_connection, domains, logger=None, page_size=None, max_workers=4):
+    """
+    Batch version of verify_domain_exists: one listing pass instead of one GET per domain.
+
+    Args:
+        api_connection (APIHelper): The active API connection.
+        domains (iterable): Domain names to check.
+        page_size (int, optional) / max_workers (int, optional): See fetch_domain_names.
+
+    Returns:
+        tuple: (set of domains that exist, list of missing domains in input order).
+    """
+    existing_on_cluster = fetch_domain_names(api_connection, page_size=page_size, max_workers=max_workers, logger=logger)
+    existing = set()
+    missing = []
+    for domain in domains:
+        if domain.lower() in existing_on_cluster:
+            existing.add(domain)
+        elif domain not in missing:
+            missing.append(domain)
+    if logger:
+        logger.info(f"Verified {len(existing)} domains exist")
+        if missing:
+            logger.warning(f"Missing domains ({len(missing)}): {', '.join(missing)}")
+    return existing, missing
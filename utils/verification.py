@@ -0,0 +1,78 @@
+from dataclasses import dataclass
+
+from utils.clusters import LISTING_TIMEOUT
+from utils.request_plan import CONFIGURATIONS_ENDPOINT
+
+@dataclass(frozen=True, slots=True)
+class Drift:
+    """A written (config, scope, reseller) whose stored value does not match. actual is None if it is missing."""
+    config_name: str
+    scope: str
+    reseller: str
+    expected: str
+    actual: str = None
+
+@dataclass(frozen=True, slots=True)
+class VerificationReport:
+    checked: int
+    matched: int
+    drift: tuple
+
+    @property
+    def ok(self):
+        return not self.drift
+
+def _target_key(config_name, scope, reseller):
+    return (config_name, scope or "*", reseller or "*")
+
+def index_configurations(records):
+    """Maps (config-name, user-scope, reseller) -> config-value for the global (domain '*') records."""
+    stored = {}
+    for record in records:
+        if not isinstance(record, dict) or record.get("domain", "*") not in ("*", "", None):
+            continue
+        key = _target_key(record.get("config-name"), record.get("user-scope"), record.get("reseller"))
+        stored[key] = record.get("config-value")
+    return stored
+
+def verify_plan(api_connection, plan, logger=None, timeout=LISTING_TIMEOUT):
+    """
+    Compares what a plan wrote against the cluster in one pass.
+
+    Fetches every configuration with a single (uncached) GET and checks each written
+    (config, scope, reseller) target. When a plan writes the same target more than once,
+    the last value is the expected one.
+
+    Args:
+        api_connection (APIHelper): The active API connection.
+        plan (iterable): PlannedRequests that were sent.
+        timeout (tuple, optional): (connect, read) seconds for the listing. Defaults to LISTING_TIMEOUT.
+
+    Returns:
+        VerificationReport
+
+    Raises:
+        ValueError: If the configuration listing does not return 200.
+    """
+    response = api_connection.get(CONFIGURATIONS_ENDPOINT, timeout=timeout, use_cache=False)
+    if response.status_code != 200:
+        raise ValueError(f"Verification failed: GET {CONFIGURATIONS_ENDPOINT} returned {response.status_code}")
+    stored = index_configurations(response.json())
+
+    expected = {}
+    for request in plan:
+        task = request.task
+        expected[_target_key(task.config_name, task.scope, task.reseller)] = task.config_value
+
+    drift = []
+    for (config_name, scope, reseller), value in expected.items():
+        actual = stored.get((config_name, scope, reseller))
+        if actual is None or str(actual) != value:
+            drift.append(Drift(config_name, scope, reseller, value, None if actual is None else str(actual)))
+
+    report = VerificationReport(checked=len(expected), matched=len(expected) - len(drift), drift=tuple(drift))
+    if logger:
+        logger.info(f"Verification: {report.matched}/{report.checked} targets match")
+        for item in report.drift:
+            logger.warning(f"Drift: {item.config_name} (Scope: {item.scope}, Reseller: {item.reseller}) expected '{item.expected}', found {repr(item.actual) if item.actual is not None else 'nothing'}")
+    return report
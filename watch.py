@@ -0,0 +1,125 @@
+"""
+Watch mode: re-applies only what changed in the blueprint.
+
+    python watch.py --cluster https://api.example.ucaas.tech --customer sgdemo --answers answers.json
+    python watch.py --blueprint config/ui_configs.json --blueprint config/extra.json \\
+        --cluster https://api.a.ucaas.tech --cluster https://api.b.ucaas.tech \\
+        --customer sgdemo --customer acme --answers answers.json
+
+Polls the blueprint file(s) and the answers file. On a change, every (blueprint, cluster, customer)
+target is re-rendered headlessly and compared, write by write, with what was last applied
+successfully to that target (WATCH_STATE_PATH, default data/watch_state.json). Only added or
+changed writes are sent. Entries removed from the blueprint are reported, never deleted.
+The first pass for a target with no snapshot applies everything.
+"""
+import argparse
+import os
+import sys
+import time
+
+from utils.blueprint_watch import AppliedRecorder, AppliedSnapshots, FileWatcher, diff_plan, snapshot_key, DEFAULT_WATCH_STATE
+from utils.logging_setup import setup_logging
+from utils.validators import validate_url
+
+DEFAULT_BLUEPRINT = os.path.join("config", "ui_configs.json")
+
+def push_delta(blueprint, cluster, customer, answers, snapshots, logger, options):
+    """Renders one target, sends its delta and records what succeeded, even if the push stops part-way. Returns the number of writes sent."""
+    import ui_configs
+    from utils.request_plan import compile_plan
+
+    key = snapshot_key(blueprint, cluster, customer)
+    label = f"{os.path.basename(blueprint)} -> {cluster}" + (f" ({customer})" if customer else "")
+    rendered = ui_configs.render_headless(ui_configs.load_items(blueprint, customer), answers)
+    plan = compile_plan(rendered, description=ui_configs.WRITE_DESCRIPTION)
+
+    applied = snapshots.get(key)
+    delta, removed = diff_plan(applied, plan)
+    for target in removed:
+        print(f"   {label}: {target[0]} (Scope: {target[1]}, Reseller: {target[2]}) left the blueprint; not deleted on the cluster")
+        del applied[target]
+    if not delta:
+        print(f">> {label}: no changes")
+        if removed:
+            snapshots.put(key, applied)
+        return 0
+
+    print(f">> {label}: pushing {len(delta)} of {len(plan)} writes")
+    logger.info(f"Watch: pushing {len(delta)}/{len(plan)} writes for {label}")
+    recorder = AppliedRecorder(applied, ui_configs.open_recorder(cluster, customer, options))
+    try:
+        failed = ui_configs.execute_plan(delta, cluster, recorder, options)
+    finally:
+        recorder.close()
+        snapshots.put(key, applied)
+    if failed:
+        print(f">> {label}: {len(failed)} write(s) failed; they are retried on the next change")
+    return len(delta)
+
+def run_pass(changed, args, clusters, snapshots, watcher, logger, options):
+    """Handles one batch of changed files. A file that fails to load stays unacknowledged and is retried."""
+    import requests
+    import ui_configs
+
+    answers_changed = args.answers in changed
+    blueprints = args.blueprint if answers_changed else [path for path in args.blueprint if path in changed]
+    try:
+        answers = ui_configs.load_answers(args.answers)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+    if answers_changed:
+        watcher.acknowledge(args.answers, changed[args.answers])
+
+    for blueprint in blueprints:
+        ok = True
+        for cluster in clusters:
+            for customer in args.customer or [None]:
+                try:
+                    push_delta(blueprint, cluster, customer, answers, snapshots, logger, options)
+                except requests.exceptions.RequestException as e:
+                    # Cluster down, timed out or out of deadline; what was sent is snapshotted, the rest is retried
+                    print(f"Error pushing to {cluster}: {e}")
+                    logger.error(f"Watch: {blueprint} for {cluster}: {e}")
+                    ok = False
+                except ValueError as e:
+                    # Typically the file is mid-save or has a bad value; wait for the next version
+                    print(f"Error in {blueprint}: {e}")
+                    logger.error(f"Watch: {blueprint} for {cluster}: {e}")
+                    ok = False
+        if ok and blueprint in changed:
+            watcher.acknowledge(blueprint, changed[blueprint])
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Watch blueprint files and push only the changed configurations.")
+    parser.add_argument("--blueprint", action="append", help=f"Blueprint JSON to watch (repeatable, default: {DEFAULT_BLUEPRINT})")
+    parser.add_argument("--cluster", action="append", required=True, help="Full API URL (repeatable)")
+    parser.add_argument("--customer", action="append", help="Customer name for 'custID' replacement (repeatable)")
+    parser.add_argument("--answers", required=True, help="Headless answers file (see ui_configs.py --answers); also watched")
+    parser.add_argument("--interval", type=float, default=2.0, help="Seconds between checks (default: 2)")
+    parser.add_argument("--state-file", default=DEFAULT_WATCH_STATE, help=f"Last-applied snapshots (default: {DEFAULT_WATCH_STATE})")
+    parser.add_argument("--parallel", type=int, default=1, metavar="N", help="Send up to N writes at once, ordered by config dependencies")
+    parser.add_argument("--once", action="store_true", help="Push the current delta once and exit")
+    return parser
+
+if __name__ == "__main__":
+    args = build_arg_parser().parse_args()
+    args.blueprint = args.blueprint or [DEFAULT_BLUEPRINT]
+    logger = setup_logging()
+    import ui_configs
+    options = ui_configs.RunOptions(max_parallel=max(1, args.parallel))
+    try:
+        clusters = [validate_url(cluster.strip(), logger=logger) for cluster in args.cluster]
+        snapshots = AppliedSnapshots(args.state_file)
+        watcher = FileWatcher(args.blueprint + [args.answers])
+        print(f"Watching {', '.join(args.blueprint)} for {len(clusters)} cluster(s); Ctrl+C to stop")
+        while True:
+            changed = watcher.poll()
+            if changed:
+                run_pass(changed, args, clusters, snapshots, watcher, logger, options)
+            if args.once:
+                break
+            time.sleep(args.interval)
+    except (ValueError, KeyboardInterrupt) as e:
+        print(f"Error: {e}" if str(e) else "Stopped")
+        sys.exit(1 if str(e) else 0)